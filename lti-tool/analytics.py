@@ -0,0 +1,199 @@
+"""
+Q&A Analytics
+Vremenski rollup-ovi (po satu i po danu) za instruktorske dashboard-e
+"""
+
+import bisect
+import calendar
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+
+GRANULARITIES = {
+    'hour': 3600,
+    'day': 86400,
+}
+
+# Log-skala granica histograma latencije u ms (~25% širina bina, 50ms - ~10min)
+LATENCY_BOUNDS_MS = []
+_bound = 50.0
+while _bound < 600000:
+    LATENCY_BOUNDS_MS.append(round(_bound))
+    _bound *= 1.25
+
+
+def to_epoch(value) -> float:
+    """
+    datetime (naive = UTC) / ISO string / epoch -> epoch sekunde
+    """
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return calendar.timegm(value.utctimetuple()) + value.microsecond / 1e6
+
+
+class _Bucket:
+    __slots__ = ('questions', 'confidence_sum', 'low_confidence', 'feedback',
+                 'rating_sum', 'latency_counts', 'latency_samples', 'latency_min', 'latency_max')
+
+    def __init__(self):
+        self.questions = 0
+        self.confidence_sum = 0.0
+        self.low_confidence = 0
+        self.feedback = 0
+        self.rating_sum = 0.0
+        self.latency_counts = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+        self.latency_samples = 0
+        self.latency_min = None
+        self.latency_max = None
+
+    def add_latency(self, latency_ms: float):
+        latency_ms = float(latency_ms)
+        self.latency_counts[bisect.bisect_left(LATENCY_BOUNDS_MS, latency_ms)] += 1
+        self.latency_samples += 1
+        if self.latency_min is None or latency_ms < self.latency_min:
+            self.latency_min = latency_ms
+        if self.latency_max is None or latency_ms > self.latency_max:
+            self.latency_max = latency_ms
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Linearna interpolacija unutar bina po kumulativnim brojevima; granice
+        bina se sužavaju na izmereni min/max (jedan uzorak -> tačna vrednost)
+        """
+        if not self.latency_samples:
+            return None
+        rank = p * self.latency_samples
+        cumulative = 0
+        for i, count in enumerate(self.latency_counts):
+            if not count or cumulative + count < rank:
+                cumulative += count
+                continue
+            lower = LATENCY_BOUNDS_MS[i - 1] if i > 0 else 0.0
+            upper = LATENCY_BOUNDS_MS[i] if i < len(LATENCY_BOUNDS_MS) else self.latency_max
+            lower = max(lower, self.latency_min)
+            upper = min(upper, self.latency_max)
+            fraction = max(rank - cumulative, 0.0) / count
+            return lower + (upper - lower) * fraction
+        return self.latency_max
+
+    def row(self, bucket_start: float) -> Dict[str, Any]:
+        return {
+            'bucket_start': datetime.fromtimestamp(bucket_start, timezone.utc).isoformat(),
+            'questions': self.questions,
+            'avg_confidence': self.confidence_sum / self.questions if self.questions else 0.0,
+            'low_confidence': self.low_confidence,
+            'feedback': self.feedback,
+            'avg_rating': self.rating_sum / self.feedback if self.feedback else 0.0,
+            'latency_p50_ms': self.percentile(0.50),
+            'latency_p95_ms': self.percentile(0.95)
+        }
+
+
+def aggregate_rows(answers, feedback) -> List[Dict[str, Any]]:
+    """
+    Redovi vremenske serije iz SPARQL agregacija (remote mod), u istom
+    formatu kao QARollups.query
+
+    Args:
+        answers: (bucket_start epoch, questions, confidence_sum, low_confidence, [latencije ms])
+        feedback: (bucket_start epoch, feedback, rating_sum)
+    """
+    buckets = {}
+    for bucket_start, questions, confidence_sum, low_confidence, latencies in answers:
+        bucket = buckets.setdefault(bucket_start, _Bucket())
+        bucket.questions += questions
+        bucket.confidence_sum += confidence_sum
+        bucket.low_confidence += low_confidence
+        for latency_ms in latencies:
+            bucket.add_latency(latency_ms)
+    for bucket_start, count, rating_sum in feedback:
+        bucket = buckets.setdefault(bucket_start, _Bucket())
+        bucket.feedback += count
+        bucket.rating_sum += rating_sum
+    return [buckets[start].row(start) for start in sorted(buckets)]
+
+
+class QARollups:
+    """
+    Bucket-i po (kurs, granularnost, početak intervala).
+
+    Svaki bucket drži broj pitanja, sumu confidence-a, broj pitanja sa niskim
+    confidence-om, broj/sumu ocena i histogram latencije (za p50/p95).
+    Memorija je ograničena: satni bucket-i stariji od hourly_retention_days se brišu.
+    """
+
+    def __init__(self, low_confidence_threshold: float = 0.5, hourly_retention_days: int = 90):
+        self.low_confidence_threshold = low_confidence_threshold
+        self.hourly_retention_days = hourly_retention_days
+
+        self._buckets = {}  # (course_id, granularity) -> {bucket_start: _Bucket}
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def _buckets_for(self, course_id: str, epoch: float):
+        for granularity, width in GRANULARITIES.items():
+            series = self._buckets.setdefault((course_id, granularity), {})
+            start = int(epoch // width * width)
+            bucket = series.get(start)
+            if bucket is None:
+                bucket = series[start] = _Bucket()
+            yield bucket
+
+    def record_answer(self, course_id: str, timestamp, confidence: float,
+                      latency_ms: Optional[float] = None):
+        epoch = to_epoch(timestamp)
+        with self._lock:
+            for bucket in self._buckets_for(course_id, epoch):
+                bucket.questions += 1
+                bucket.confidence_sum += float(confidence)
+                if confidence < self.low_confidence_threshold:
+                    bucket.low_confidence += 1
+                if latency_ms is not None:
+                    bucket.add_latency(latency_ms)
+            self._prune_locked()
+
+    def record_feedback(self, course_id: str, timestamp, rating):
+        epoch = to_epoch(timestamp)
+        with self._lock:
+            for bucket in self._buckets_for(course_id, epoch):
+                bucket.feedback += 1
+                bucket.rating_sum += float(rating or 0)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def _prune_locked(self):
+        now = time.time()
+        if now - self._last_prune < 3600:
+            return
+        self._last_prune = now
+        cutoff = now - self.hourly_retention_days * 86400
+        for (_, granularity), series in self._buckets.items():
+            if granularity == 'hour':
+                for start in [s for s in series if s < cutoff]:
+                    del series[start]
+
+    def query(self, course_id: str, start=None, end=None,
+              granularity: str = 'day') -> List[Dict[str, Any]]:
+        """
+        Vraća bucket-e kursa u intervalu [start, end) - bez pristupa triple-ovima
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity '{granularity}', expected one of {sorted(GRANULARITIES)}")
+
+        start_epoch = to_epoch(start) if start is not None else 0
+        end_epoch = to_epoch(end) if end is not None else float('inf')
+
+        with self._lock:
+            series = self._buckets.get((course_id, granularity), {})
+            return [series[bucket_start].row(bucket_start)
+                    for bucket_start in sorted(s for s in series if start_epoch <= s < end_epoch)]
@@ -0,0 +1,239 @@
+"""
+Semantic Answer Cache
+Keš odgovora po kursu, ključ je embedding pitanja (cosine similarity)
+"""
+
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+class _CourseCache:
+    """
+    Keš unosi za jedan kurs (LRU redosled) + keširana matrica embedding-a
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()  # entry_id -> (embedding, result, created_at)
+        self.generation = None  # verzija materijala kursa za koju unosi važe
+        self.matrix = None
+        self.keys = []
+
+    def rebuild_matrix(self):
+        self.keys = list(self.entries.keys())
+        if self.keys:
+            self.matrix = np.vstack([self.entries[k][0] for k in self.keys])
+        else:
+            self.matrix = None
+
+
+# store() bez zadate verzije kešira za trenutnu verziju materijala
+_CURRENT = object()
+
+
+class SemanticAnswerCache:
+    """
+    Keš odgovora za RAG pipeline.
+
+    Novo pitanje čiji je embedding unutar cosine praga od nekog keširanog
+    pitanja istog kursa dobija sačuvani odgovor i izvore. Keš je ograničen
+    po broju unosa po kursu i po broju kurseva (LRU), a unosi ističu posle TTL-a.
+
+    Unosi su u memoriji procesa, ali invalidacija važi za sve worker-e:
+    invalidate() atomično (os.replace) upisuje novu verziju u version fajl
+    kursa u version_dir, a lookup/store porede je sa verzijom za koju su
+    unosi keširani - ako se razlikuju, keš kursa se prazni.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries_per_course: int = 256,
+                 max_courses: int = 64, ttl_seconds: float = 3600,
+                 version_dir: str = 'data/answer-cache'):
+        """
+        Args:
+            threshold: Minimalna cosine sličnost za cache hit
+            max_entries_per_course: Maksimalan broj odgovora po kursu
+            max_courses: Maksimalan broj kurseva u kešu
+            ttl_seconds: Vreme života unosa u sekundama
+            version_dir: Direktorijum version fajlova po kursu (deljen između worker-a)
+        """
+        self.threshold = threshold
+        self.max_entries_per_course = max_entries_per_course
+        self.max_courses = max_courses
+        self.ttl_seconds = ttl_seconds
+        self.version_dir = version_dir
+        os.makedirs(version_dir, exist_ok=True)
+
+        self._courses = OrderedDict()  # course_id -> _CourseCache
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _version_path(self, course_id: str) -> str:
+        safe = re.sub(r'[^A-Za-z0-9_.-]', '_', str(course_id))
+        return os.path.join(self.version_dir, f'course_{safe}.version')
+
+    def generation(self, course_id: str):
+        """
+        Trenutna verzija materijala kursa (menja se pri svakoj invalidaciji, u bilo kom procesu)
+        """
+        try:
+            with open(self._version_path(course_id), encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _sync_generation(self, course: _CourseCache, generation):
+        if course.generation != generation:
+            if course.entries:
+                self.invalidations += 1
+            course.entries.clear()
+            course.matrix = None
+            course.generation = generation
+
+    def _expire(self, course: _CourseCache, now: float):
+        expired = [k for k, (_, _, created) in course.entries.items()
+                   if now - created > self.ttl_seconds]
+        for key in expired:
+            del course.entries[key]
+        if expired:
+            self.evictions += len(expired)
+            course.matrix = None
+
+    def lookup(self, course_id: str, embedding) -> Optional[Dict[str, Any]]:
+        """
+        Vraća keširan odgovor za najsličnije pitanje ili None
+        """
+        query = self._normalize(embedding)
+        now = time.time()
+        generation = self.generation(course_id)
+
+        with self._lock:
+            course = self._courses.get(course_id)
+            if course is None:
+                self.misses += 1
+                return None
+
+            self._courses.move_to_end(course_id)
+            self._sync_generation(course, generation)
+            self._expire(course, now)
+            if course.matrix is None:
+                course.rebuild_matrix()
+            if course.matrix is None:
+                self.misses += 1
+                return None
+
+            similarities = course.matrix @ query
+            best = int(np.argmax(similarities))
+            if float(similarities[best]) < self.threshold:
+                self.misses += 1
+                return None
+
+            key = course.keys[best]
+            course.entries.move_to_end(key)
+            self.hits += 1
+            result = course.entries[key][1]
+
+        return {
+            **result,
+            'sources': [dict(source) for source in result.get('sources', [])],
+            'similarity': float(similarities[best])
+        }
+
+    def store(self, course_id: str, embedding, result: Dict[str, Any], generation=_CURRENT):
+        """
+        Čuva odgovor (answer, confidence, sources) za embedding pitanja
+
+        Args:
+            generation: Verzija materijala pre retrieval-a (vidi generation());
+                        ako se u međuvremenu promenila, odgovor se ne kešira
+        """
+        current = self.generation(course_id)
+        if generation is not _CURRENT and generation != current:
+            return
+        vector = self._normalize(embedding)
+        entry = {
+            'answer': result.get('answer', ''),
+            'confidence': result.get('confidence', 0.0),
+            'sources': [dict(source) for source in result.get('sources', [])]
+        }
+
+        with self._lock:
+            course = self._courses.get(course_id)
+            if course is None:
+                course = self._courses[course_id] = _CourseCache()
+                while len(self._courses) > self.max_courses:
+                    _, dropped = self._courses.popitem(last=False)
+                    self.evictions += len(dropped.entries)
+            self._courses.move_to_end(course_id)
+            self._sync_generation(course, current)
+
+            self._next_id += 1
+            course.entries[self._next_id] = (vector, entry, time.time())
+            while len(course.entries) > self.max_entries_per_course:
+                course.entries.popitem(last=False)
+                self.evictions += 1
+            course.matrix = None
+
+    def invalidate(self, course_id: str):
+        """
+        Briše sve keširane odgovore za kurs (npr. posle izmene materijala),
+        u svim procesima - nova verzija se upisuje u version fajl kursa
+        """
+        path = self._version_path(course_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(uuid.uuid4().hex)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._courses.pop(course_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'courses': len(self._courses),
+                'entries': sum(len(c.entries) for c in self._courses.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+# Process-wide instanca
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """
+    Factory funkcija - vraća zajednički keš odgovora za proces
+    """
+    global _answer_cache
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                _answer_cache = SemanticAnswerCache(
+                    threshold=float(os.environ.get('ANSWER_CACHE_THRESHOLD', 0.92)),
+                    max_entries_per_course=int(os.environ.get('ANSWER_CACHE_MAX_ENTRIES', 256)),
+                    max_courses=int(os.environ.get('ANSWER_CACHE_MAX_COURSES', 64)),
+                    ttl_seconds=float(os.environ.get('ANSWER_CACHE_TTL', 3600)),
+                    version_dir=os.environ.get('ANSWER_CACHE_VERSION_DIR', 'data/answer-cache')
+                )
+    return _answer_cache
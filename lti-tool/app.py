@@ -3,17 +3,28 @@ LTI Q&A Tool - Flask Application
 Inteligentni Q&A Agent integrisan sa Canvas/Moodle preko IMS LTI 1.3
 """
 
-from flask import Flask, request, jsonify, render_template, session
+from flask import Flask, request, jsonify, render_template, session, Response, stream_with_context
 from flask_cors import CORS
 from pylti1p3.contrib.flask import FlaskOIDCLogin, FlaskMessageLaunch, FlaskRequest
 from pylti1p3.tool_config import ToolConfJsonFile
 from pylti1p3.registration import Registration
-from rag_engine import get_rag_engine
+from rag_engine import get_rag_engine, get_engine_registry_stats
+from ollama_client import get_ollama_client, OllamaBusyError
+from answer_cache import get_answer_cache
+from context_builder import get_context_builder
+from reranker import RERANK_ENABLED, get_reranker, reranker_stats
+from embedding_service import get_embedder, is_loaded as embedder_loaded
 
 import os
+import json
 import uuid
+import atexit
+import time
 from datetime import datetime
 from semantic_layer import SemanticLayer
+from semantic_writer import SemanticWriteQueue
+from sparql_remote import SparqlUnavailableError
+from ingestion import IngestionQueue, ExtractionError
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -28,6 +39,39 @@ tool_conf = ToolConfJsonFile('configs/lti-config.json')
 # Initialize Semantic Layer
 semantic_layer = SemanticLayer('ontology/lms-tools.ttl')
 
+# Upisi u semantic layer idu kroz write-behind red (ne blokiraju request)
+semantic_writer = SemanticWriteQueue(
+    semantic_layer,
+    maxsize=int(os.environ.get('SEMANTIC_QUEUE_SIZE', 1000)),
+    batch_size=int(os.environ.get('SEMANTIC_BATCH_SIZE', 100)),
+    flush_interval=float(os.environ.get('SEMANTIC_FLUSH_INTERVAL', 0.5))
+)
+
+# Obrada upload-ovanih materijala ide kroz pozadinski red poslova (na disku)
+ingestion_queue = IngestionQueue(
+    get_rag_engine,
+    jobs_dir=os.environ.get('INGEST_JOBS_DIR', 'data/ingest-jobs'),
+    workers=int(os.environ.get('INGEST_WORKERS', 2))
+)
+
+
+def shutdown():
+    """
+    Drain write-behind reda i završetak pozadinskih poslova (poziva se pri gašenju worker-a)
+    """
+    ingestion_queue.close()
+    semantic_writer.close()
+    semantic_layer.close()
+
+
+atexit.register(shutdown)
+
+# Embedding model se učitava jednom pri startu worker-a (ne na prvom pitanju)
+if os.environ.get('EMBEDDER_PRELOAD', '1') == '1':
+    get_embedder()
+    if RERANK_ENABLED:
+        get_reranker()
+
 
 
 
@@ -91,7 +135,7 @@ def launch():
         session['is_instructor'] = is_instructor
         
         # Log launch
-        semantic_layer.log_tool_launch(
+        semantic_writer.log_tool_launch(
             tool_uri=f"http://example.org/tools/{uuid.uuid4()}",
             course_uri=f"http://example.org/courses/{course_id}",
             user_uri=f"http://example.org/users/{user_id}"
@@ -133,24 +177,35 @@ def ask_question():
         rag = get_rag_engine(course_id)
         
         # Pozovi RAG pipeline
+        started = time.perf_counter()
         result = rag.ask(question)
+        latency_ms = (time.perf_counter() - started) * 1000
         
-        # Log u semantic layer
-        semantic_layer.register_qa_session(
+        # Log u semantic layer (asinhrono, kroz write-behind red)
+        question_id, _ = semantic_writer.register_qa_session(
             question_text=question,
             answer_text=result['answer'],
             course_id=course_id,
             user_id=user_id,
-            confidence=result['confidence']
+            confidence=result['confidence'],
+            latency_ms=latency_ms
         )
         
         return jsonify({
             'answer': result['answer'],
             'confidence': result['confidence'],
-            'cached': False,
-            'sources': result['sources']
+            'cached': result.get('cached', False),
+            'sources': result['sources'],
+            'context_stats': result.get('context_stats'),
+            'question_id': question_id
         })
         
+    except OllamaBusyError as e:
+        app.logger.warning(f"Ollama busy: {str(e)}")
+        return jsonify({
+            'error': 'Asistent je trenutno preopterećen, pokušajte ponovo za nekoliko sekundi.',
+            'details': str(e)
+        }), 503, {'Retry-After': '10'}
     except Exception as e:
         app.logger.error(f"Error processing question: {str(e)}")
         import traceback
@@ -161,6 +216,62 @@ def ask_question():
         }), 500
 
 
+@app.route('/api/ask/stream', methods=['POST'])
+def ask_question_stream():
+    """
+    Streaming verzija /api/ask - Server-Sent Events
+    
+    Redosled event-a: `sources` (izvori + confidence), zatim `token` za svaki
+    deo odgovora i na kraju `done` sa kompletnim odgovorom. Logovanje u
+    semantic layer se radi tek kada se stream završi.
+    """
+    data = request.json or {}
+    question = data.get('question', '').strip()
+    course_id = data.get('course_id', 'default')
+    user_id = session.get('user_id', 'anonymous')
+    
+    if not question:
+        return jsonify({'error': 'Pitanje ne može biti prazno'}), 400
+    
+    def sse(event, payload):
+        return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    
+    def generate():
+        started = time.perf_counter()
+        try:
+            rag = get_rag_engine(course_id)
+            
+            for event in rag.stream_answer(question):
+                event_type = event.pop('type')
+                
+                if event_type == 'done':
+                    event['question_id'], _ = semantic_writer.register_qa_session(
+                        question_text=question,
+                        answer_text=event['answer'],
+                        course_id=course_id,
+                        user_id=user_id,
+                        confidence=event['confidence'],
+                        latency_ms=(time.perf_counter() - started) * 1000
+                    )
+                
+                yield sse(event_type, event)
+        except OllamaBusyError as e:
+            app.logger.warning(f"Ollama busy: {str(e)}")
+            yield sse('error', {'error': 'Asistent je trenutno preopterećen, pokušajte ponovo za nekoliko sekundi.',
+                                'details': str(e)})
+        except Exception as e:
+            app.logger.error(f"Error streaming answer: {str(e)}")
+            import traceback
+            app.logger.error(traceback.format_exc())
+            yield sse('error', {'error': 'Došlo je do greške pri obradi pitanja.', 'details': str(e)})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.route('/api/debug/session', methods=['GET'])
 def debug_session():
     """Debug endpoint - prikazuje session data"""
@@ -170,6 +281,67 @@ def debug_session():
         'course_id': session.get('course_id', 'NOT_SET')
     })
 
+@app.route('/api/debug/stats', methods=['GET'])
+def debug_stats():
+    """Debug endpoint - runtime statistika (Ollama slotovi, keš odgovora, engine registar)"""
+    return jsonify({
+        'ollama': get_ollama_client().stats(),
+        'answer_cache': get_answer_cache().stats(),
+        'context': get_context_builder().stats(),
+        'reranker': reranker_stats(),
+        'embedder_loaded': embedder_loaded(),
+        'engines': get_engine_registry_stats(),
+        'semantic_queue': semantic_writer.stats(),
+        'sparql_cache': semantic_layer.query_cache.stats(),
+        'sparql_remote': semantic_layer.remote.stats() if semantic_layer.remote else None,
+        'fuseki_sync': semantic_layer.outbox.stats() if semantic_layer.outbox else None,
+        'ingestion': ingestion_queue.stats()
+    })
+
+@app.route('/api/admin/sync-fuseki', methods=['POST'])
+def sync_fuseki():
+    """
+    Šalje semantički graf u Fuseki (delta sa SEMANTIC_DELTA_SYNC=1, inače ceo graf)
+    """
+    if not session.get('is_instructor', False):
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    full = bool((request.json or {}).get('full', False)) if request.is_json else False
+    ok = semantic_layer.export_to_fuseki(os.environ.get('FUSEKI_URL', 'http://fuseki:3030'), full=full)
+    return jsonify({
+        'success': ok,
+        'sync': semantic_layer.outbox.stats() if semantic_layer.outbox else None
+    }), (200 if ok else 502)
+
+@app.route('/api/analytics/<course_id>', methods=['GET'])
+def course_analytics(course_id):
+    """
+    Vremenska serija Q&A metrika za kurs (samo za instruktore)
+    
+    Query parametri: granularity (hour|day), start, end (ISO datum/vreme)
+    """
+    if not session.get('is_instructor', False):
+        return jsonify({'error': 'Samo instruktori mogu da vide analitiku'}), 403
+    
+    granularity = request.args.get('granularity', 'day')
+    try:
+        rows = semantic_layer.get_course_timeseries(
+            course_id,
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            granularity=granularity
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except SparqlUnavailableError as e:
+        return jsonify({'error': str(e)}), 503
+    
+    return jsonify({
+        'course_id': course_id,
+        'granularity': granularity,
+        'buckets': rows
+    })
+
 @app.route('/api/admin/upload-document', methods=['POST'])
 def upload_document():
     """
@@ -198,7 +370,8 @@ def upload_document():
             return jsonify({
                 'status': 'success',
                 'message': f'Dokument {filename} uspješno upload-ovan',
-                'stats': stats
+                'stats': stats,
+                'ingest': rag.last_ingest_stats
             })
         else:
             return jsonify({'error': 'Greška pri upload-u'}), 500
@@ -218,7 +391,7 @@ def submit_feedback():
     comment = data.get('comment', '')
     
     # Store feedback in semantic layer
-    semantic_layer.add_feedback(question_id, rating, comment)
+    semantic_writer.add_feedback(question_id, rating, comment)
     
     return jsonify({'status': 'success'})
 
@@ -290,92 +463,21 @@ def upload_material():
             return jsonify({'error': 'No file selected'}), 400
         
         filename = file.filename
-        ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        app.logger.info(f"Upload attempt: {filename} (course: {course_id})")
         
-        app.logger.info(f"Upload attempt: {filename} (ext: {ext})")
+        # Ekstrakcija, chunking i embedding se rade u pozadini
+        try:
+            job = ingestion_queue.submit(file.read(), filename, course_id)
+        except ExtractionError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Procesiranje fajla na osnovu tipa
-        content = None
-        
-        if ext in ['txt', 'md']:
-            # Plain text
-            content = file.read().decode('utf-8', errors='ignore')
-        
-        elif ext == 'pdf':
-            # PDF processing
-            try:
-                from PyPDF2 import PdfReader
-                import io
-                
-                pdf_bytes = file.read()
-                pdf = PdfReader(io.BytesIO(pdf_bytes))
-                
-                pages_text = []
-                for page_num, page in enumerate(pdf.pages):
-                    try:
-                        text = page.extract_text()
-                        if text.strip():
-                            pages_text.append(text)
-                    except Exception as e:
-                        app.logger.warning(f"Error extracting page {page_num}: {e}")
-                
-                content = '\n\n'.join(pages_text)
-                
-                if not content.strip():
-                    return jsonify({'error': 'PDF je prazan ili nije mogao biti pročitan'}), 400
-                
-            except Exception as e:
-                app.logger.error(f"PDF processing error: {e}")
-                return jsonify({'error': f'PDF greška: {str(e)}'}), 400
-        
-        elif ext == 'docx':
-            # DOCX processing
-            try:
-                from docx import Document
-                import io
-                
-                docx_bytes = file.read()
-                doc = Document(io.BytesIO(docx_bytes))
-                
-                paragraphs = [para.text for para in doc.paragraphs if para.text.strip()]
-                content = '\n\n'.join(paragraphs)
-                
-                if not content.strip():
-                    return jsonify({'error': 'DOCX je prazan'}), 400
-                
-            except Exception as e:
-                app.logger.error(f"DOCX processing error: {e}")
-                return jsonify({'error': f'DOCX greška: {str(e)}'}), 400
-        
-        else:
-            return jsonify({'error': f'Nepodržan format: {ext}'}), 400
-        
-        # Provera da sadržaj nije prazan
-        if not content or not content.strip():
-            return jsonify({'error': 'Fajl je prazan ili nečitljiv'}), 400
-        
-        # Upload u ChromaDB
-        rag = get_rag_engine(course_id)
-        success = rag.add_document(content, {
+        return jsonify({
+            'success': True,
+            'job_id': job['job_id'],
             'filename': filename,
-            'course_id': course_id,
-            'file_type': ext
-        })
-        
-        if success:
-            # Izračunaj broj chunks
-            chunks_count = len(content) // 800 + 1
-            
-            app.logger.info(f"Upload success: {filename} ({chunks_count} chunks)")
-            
-            return jsonify({
-                'success': True,
-                'filename': filename,
-                'chunks': chunks_count,
-                'size': len(content)
-            })
-        else:
-            return jsonify({'error': 'Upload u ChromaDB nije uspeo'}), 500
+            'state': job['state'],
+            'status_url': f"/api/ingest-jobs/{job['job_id']}"
+        }), 202
             
     except Exception as e:
         app.logger.error(f"Upload error: {str(e)}")
@@ -383,68 +485,36 @@ def upload_material():
         app.logger.error(traceback.format_exc())
         return jsonify({'error': f'Server greška: {str(e)}'}), 500
 
+@app.route('/api/ingest-jobs/<job_id>', methods=['GET'])
+def ingest_job_status(job_id):
+    """
+    Status posla obrade materijala: state (queued/extracting/indexing/done/failed),
+    chunks_done/chunks_total, chunks_per_sec, error
+    """
+    job = ingestion_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Posao ne postoji'}), 404
+    return jsonify(job)
+
 @app.route('/api/materials', methods=['GET'])
 def list_materials():
     """
-    Lista svih materijala u ChromaDB
+    Lista materijala kursa (iz manifesta materijala)
+    Query parametri: course_id, offset (default 0), limit (default: svi)
     """
     try:
         course_id = request.args.get('course_id', '1')
+        try:
+            offset = max(int(request.args.get('offset', 0)), 0)
+            limit = request.args.get('limit')
+            limit = max(int(limit), 0) if limit is not None else None
+        except ValueError:
+            return jsonify({'error': 'offset i limit moraju biti celi brojevi'}), 400
         
         app.logger.info(f"Fetching materials for course {course_id}")
         
-        # Get RAG engine
         rag = get_rag_engine(course_id)
-        
-        if not rag.collection:
-            return jsonify({
-                'total_files': 0,
-                'total_chunks': 0,
-                'files': []
-            })
-        
-        # Get all items from collection
-        collection = rag.collection
-        results = collection.get()
-        
-        if not results['ids']:
-            return jsonify({
-                'total_files': 0,
-                'total_chunks': 0,
-                'files': []
-            })
-        
-        # Group by filename
-        files = {}
-        for chunk_id in results['ids']:
-            # Extract filename from chunk_id (format: "filename_N")
-            parts = chunk_id.rsplit('_', 1)
-            if len(parts) == 2:
-                filename = parts[0]
-                metadata = results['metadatas'][results['ids'].index(chunk_id)] if results.get('metadatas') else {}
-                
-                if filename not in files:
-                    files[filename] = {
-                        'chunks': 0,
-                        'type': metadata.get('file_type', 'unknown')
-                    }
-                files[filename]['chunks'] += 1
-        
-        # Format response
-        files_list = [
-            {
-                'filename': name,
-                'chunks': info['chunks'],
-                'type': info['type']
-            }
-            for name, info in sorted(files.items())
-        ]
-        
-        return jsonify({
-            'total_files': len(files),
-            'total_chunks': len(results['ids']),
-            'files': files_list
-        })
+        return jsonify(rag.list_materials(offset, limit))
         
     except Exception as e:
         app.logger.error(f"Error listing materials: {str(e)}")
@@ -472,23 +542,15 @@ def delete_material():
         if not rag.collection:
             return jsonify({'error': 'Collection not found'}), 404
         
-        collection = rag.collection
+        # Chunk id-jevi fajla dolaze iz manifesta - ne čita se cela kolekcija
+        deleted = rag.delete_material(filename)
         
-        # Find all chunk IDs for this file
-        results = collection.get()
-        ids_to_delete = [
-            chunk_id for chunk_id in results['ids']
-            if chunk_id.startswith(filename + '_')
-        ]
-        
-        if ids_to_delete:
-            collection.delete(ids=ids_to_delete)
-            
-            app.logger.info(f"Deleted {len(ids_to_delete)} chunks for {filename}")
+        if deleted:
+            app.logger.info(f"Deleted {deleted} chunks for {filename}")
             
             return jsonify({
                 'success': True,
-                'deleted_chunks': len(ids_to_delete),
+                'deleted_chunks': deleted,
                 'filename': filename
             })
         else:
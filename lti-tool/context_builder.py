@@ -0,0 +1,245 @@
+"""
+Context Builder
+Sastavljanje LLM konteksta iz pronađenih chunk-ova u okviru budžeta tokena
+"""
+
+import math
+import os
+import re
+import threading
+from typing import Any, Dict, List, Tuple
+
+from text_utils import tokenize
+
+
+# Rečenice: kraj rečenice ili novi red; predugačke "rečenice" (PDF bez interpunkcije) se dele
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+MAX_SENTENCE_CHARS = 400
+
+
+def _split_sentences(text: str) -> List[str]:
+    sentences = []
+    for sentence in _SENTENCE_SPLIT_RE.split(text):
+        sentence = sentence.strip()
+        while len(sentence) > MAX_SENTENCE_CHARS:
+            cut = sentence.rfind(' ', 0, MAX_SENTENCE_CHARS)
+            if cut <= 0:
+                cut = MAX_SENTENCE_CHARS
+            sentences.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def _terms(text: str) -> set:
+    return set(tokenize(text, min_len=3, stem_len=6))
+
+
+class ContextBuilder:
+    """
+    Pretvara top-k chunk-ove iz retrieval-a u kompaktan kontekst za prompt:
+
+        1. susedni i preklopljeni chunk-ovi istog fajla (i strane) se spajaju
+           u jedan pasus po char_start metapodatku - overlap se ne ponavlja
+        2. pasusi čiji su termini skoro svi već sadržani u boljem pasusu
+           (npr. isti materijal pod drugim imenom) se izbacuju
+        3. ako kontekst i dalje prelazi budžet, iz pasusa se biraju rečenice
+           sa najviše termina iz pitanja (pa po rangu pasusa) dok se budžet
+           ne popuni; izabrane rečenice ostaju u originalnom redosledu
+
+    Tokeni se procenjuju iz broja karaktera (chars_per_token).
+    """
+
+    def __init__(self, token_budget: int = 1200, chars_per_token: float = 3.5,
+                 dedup_threshold: float = 0.9):
+        """
+        Args:
+            token_budget: Maksimalan broj tokena konteksta (0 = bez ograničenja)
+            chars_per_token: Prosečan broj karaktera po tokenu za procenu
+            dedup_threshold: Udeo termina pasusa već sadržanih u boljem pasusu
+                             iznad kog se pasus smatra duplikatom
+        """
+        self.token_budget = token_budget
+        self.chars_per_token = chars_per_token
+        self.dedup_threshold = dedup_threshold
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.compressed = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def estimate_tokens(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def build(self, question: str, chunks: List[Dict]) -> Tuple[List[Dict], Dict[str, Any]]:
+        """
+        Args:
+            question: Pitanje studenta
+            chunks: Chunk-ovi iz retrieval-a (content, metadata, distance), najbolji prvi
+
+        Returns:
+            (pasusi za prompt u istom formatu kao chunk-ovi, statistika)
+        """
+        tokens_before = self.estimate_tokens("\n\n".join(c['content'] for c in chunks))
+
+        passages = self._merge(chunks)
+        merged = len(chunks) - len(passages)
+        passages, duplicates = self._dedupe(passages)
+
+        compressed = False
+        if self.token_budget > 0 and self._passage_tokens(passages) > self.token_budget:
+            passages = self._extract(question, passages)
+            compressed = True
+
+        tokens_after = self._passage_tokens(passages)
+        stats = {
+            'chunks': len(chunks),
+            'passages': len(passages),
+            'merged': merged,
+            'duplicates': duplicates,
+            'compressed': compressed,
+            'tokens_before': tokens_before,
+            'tokens_after': tokens_after,
+            'tokens_saved': max(tokens_before - tokens_after, 0)
+        }
+
+        with self._lock:
+            self.requests += 1
+            self.compressed += int(compressed)
+            self.tokens_before += tokens_before
+            self.tokens_after += tokens_after
+
+        return passages, stats
+
+    def _passage_tokens(self, passages: List[Dict]) -> int:
+        return self.estimate_tokens("\n\n".join(p['content'] for p in passages))
+
+    def _merge(self, chunks: List[Dict]) -> List[Dict]:
+        """
+        Spaja chunk-ove istog fajla/strane čiji se opsezi dodiruju ili preklapaju;
+        spojeni pasus zadržava najbolji rang i najmanju distancu
+        """
+        passages = []
+        spans = {}  # (filename, page) -> [pasus, ...]
+
+        for rank, chunk in enumerate(chunks):
+            metadata = chunk.get('metadata') or {}
+            passage = {
+                'content': chunk['content'],
+                'metadata': metadata,
+                'distance': chunk.get('distance'),
+                'rank': rank
+            }
+            start = metadata.get('char_start')
+            if start is None:
+                passages.append(passage)
+                continue
+
+            key = (metadata.get('filename'), metadata.get('page_start'))
+            passage['start'], passage['end'] = start, start + len(chunk['content'])
+            spans.setdefault(key, []).append(passage)
+
+        for group in spans.values():
+            group.sort(key=lambda p: p['start'])
+            current = group[0]
+            for passage in group[1:]:
+                if passage['start'] <= current['end']:
+                    overlap = current['end'] - passage['start']
+                    if passage['end'] > current['end']:
+                        current['content'] += passage['content'][overlap:]
+                        current['end'] = passage['end']
+                    current['rank'] = min(current['rank'], passage['rank'])
+                    if passage['distance'] is not None:
+                        current['distance'] = min(
+                            d for d in (current['distance'], passage['distance']) if d is not None
+                        )
+                else:
+                    passages.append(current)
+                    current = passage
+            passages.append(current)
+
+        passages.sort(key=lambda p: p['rank'])
+        return passages
+
+    def _dedupe(self, passages: List[Dict]) -> Tuple[List[Dict], int]:
+        kept, kept_terms = [], []
+        for passage in passages:
+            terms = _terms(passage['content'])
+            if terms and any(len(terms & other) / len(terms) >= self.dedup_threshold
+                             for other in kept_terms):
+                continue
+            kept.append(passage)
+            kept_terms.append(terms)
+        return kept, len(passages) - len(kept)
+
+    def _extract(self, question: str, passages: List[Dict]) -> List[Dict]:
+        """
+        Ekstraktivna kompresija: najrelevantnije rečenice dok ima budžeta
+        """
+        question_terms = _terms(question)
+        candidates = []  # (-skor, indeks pasusa, indeks rečenice)
+        sentences = []
+        for p_index, passage in enumerate(passages):
+            sentences.append(_split_sentences(passage['content']))
+            for s_index, sentence in enumerate(sentences[-1]):
+                score = (len(question_terms & _terms(sentence)) / len(question_terms)
+                         if question_terms else 0.0)
+                candidates.append((-score, p_index, s_index))
+
+        # Separator između pasusa i rečenica se računa u budžet
+        budget_chars = self.token_budget * self.chars_per_token
+        used = 0
+        selected = set()
+        for _, p_index, s_index in sorted(candidates):
+            cost = len(sentences[p_index][s_index]) + 2
+            if used + cost > budget_chars:
+                continue
+            selected.add((p_index, s_index))
+            used += cost
+
+        extracted = []
+        for p_index, passage in enumerate(passages):
+            parts, previous = [], None
+            for s_index, sentence in enumerate(sentences[p_index]):
+                if (p_index, s_index) not in selected:
+                    continue
+                if previous is not None and s_index != previous + 1:
+                    parts.append('…')
+                parts.append(sentence)
+                previous = s_index
+            if parts:
+                extracted.append(dict(passage, content=' '.join(parts)))
+        return extracted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'token_budget': self.token_budget,
+                'requests': self.requests,
+                'compressed': self.compressed,
+                'tokens_before': self.tokens_before,
+                'tokens_after': self.tokens_after,
+                'tokens_saved': self.tokens_before - self.tokens_after
+            }
+
+
+# Process-wide instanca
+_context_builder = None
+_context_builder_lock = threading.Lock()
+
+def get_context_builder() -> ContextBuilder:
+    """
+    Factory funkcija - vraća zajednički context builder za proces
+    """
+    global _context_builder
+    if _context_builder is None:
+        with _context_builder_lock:
+            if _context_builder is None:
+                _context_builder = ContextBuilder(
+                    token_budget=int(os.environ.get('CONTEXT_TOKEN_BUDGET', 1200)),
+                    chars_per_token=float(os.environ.get('CONTEXT_CHARS_PER_TOKEN', 3.5)),
+                    dedup_threshold=float(os.environ.get('CONTEXT_DEDUP_THRESHOLD', 0.9))
+                )
+    return _context_builder
@@ -0,0 +1,64 @@
+"""
+Course Statistics
+Materijalizovani brojači po kursu, ažurirani pri svakom upisu
+"""
+
+import threading
+from typing import Any, Dict
+
+
+class CourseStats:
+    """
+    Po kursu: broj pitanja, suma confidence-a, broj feedback-a i suma ocena.
+    get() je O(1) - nema SPARQL agregacije nad celom istorijom.
+    """
+
+    def __init__(self):
+        self._courses = {}
+        self._lock = threading.Lock()
+
+    def _course(self, course_id: str) -> Dict[str, float]:
+        course = self._courses.get(course_id)
+        if course is None:
+            course = self._courses[course_id] = {
+                'questions': 0,
+                'confidence_sum': 0.0,
+                'feedback': 0,
+                'rating_sum': 0.0
+            }
+        return course
+
+    def add_answer(self, course_id: str, confidence: float):
+        with self._lock:
+            course = self._course(course_id)
+            course['questions'] += 1
+            course['confidence_sum'] += float(confidence)
+
+    def add_feedback(self, course_id: str, rating):
+        with self._lock:
+            course = self._course(course_id)
+            course['feedback'] += 1
+            course['rating_sum'] += float(rating or 0)
+
+    def clear(self):
+        with self._lock:
+            self._courses.clear()
+
+    def get(self, course_id: str) -> Dict[str, Any]:
+        with self._lock:
+            course = self._courses.get(course_id)
+            if course is None:
+                return {
+                    'total_questions': 0,
+                    'avg_confidence': 0.0,
+                    'total_feedback': 0,
+                    'avg_rating': 0.0
+                }
+            return {
+                'total_questions': course['questions'],
+                'avg_confidence': (course['confidence_sum'] / course['questions']
+                                   if course['questions'] else 0.0),
+                'total_feedback': course['feedback'],
+                'avg_rating': (course['rating_sum'] / course['feedback']
+                               if course['feedback'] else 0.0)
+            }
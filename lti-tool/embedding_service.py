@@ -0,0 +1,34 @@
+"""
+Embedding Service
+Jedan Sentence Transformer model po procesu, deljen između svih RAG engine-a
+"""
+
+import os
+import threading
+import time
+
+from sentence_transformers import SentenceTransformer
+
+
+EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL', 'paraphrase-multilingual-MiniLM-L12-v2')
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+def get_embedder() -> SentenceTransformer:
+    """
+    Vraća zajednički embedding model (učitava se samo jednom po procesu)
+    """
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                print(f"Loading embedding model {EMBEDDING_MODEL}...")
+                started = time.perf_counter()
+                _embedder = SentenceTransformer(EMBEDDING_MODEL)
+                print(f"✓ Embedding model loaded ({time.perf_counter() - started:.1f}s)")
+    return _embedder
+
+
+def is_loaded() -> bool:
+    return _embedder is not None
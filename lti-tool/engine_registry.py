@@ -0,0 +1,135 @@
+"""
+Engine Registry
+Ograničen, thread-safe registar RAG engine-a po kursu (LRU + single-flight)
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+
+def current_rss_mb() -> float:
+    """
+    Trenutni RSS procesa u MB (Linux /proc), 0 ako nije dostupno
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class _PendingBuild:
+    def __init__(self):
+        self.event = threading.Event()
+        self.engine = None
+        self.error = None
+
+
+class EngineRegistry:
+    """
+    Registar engine-a sa LRU izbacivanjem.
+
+    - max_engines: maksimalan broj kurseva u memoriji
+    - memory_budget_mb: ako je RSS procesa iznad budžeta, pri svakom novom
+      engine-u izbacuje se najduže nekorišćeni (0 = isključeno)
+    - single-flight: istovremeni promašaji za isti kurs čekaju jednu izgradnju
+    """
+
+    def __init__(self, factory: Callable[[str], Any], max_engines: int = 64,
+                 memory_budget_mb: float = 0):
+        self._factory = factory
+        self.max_engines = max_engines
+        self.memory_budget_mb = memory_budget_mb
+
+        self._engines = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.evictions = 0
+        self.build_errors = 0
+
+    def get(self, key: str):
+        """
+        Vraća engine za ključ, gradi ga ako ne postoji
+        """
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is not None:
+                self._engines.move_to_end(key)
+                self.hits += 1
+                return engine
+
+            pending = self._pending.get(key)
+            is_builder = pending is None
+            if is_builder:
+                pending = self._pending[key] = _PendingBuild()
+                self.misses += 1
+            else:
+                self.waits += 1
+
+        if not is_builder:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.engine
+
+        try:
+            engine = self._factory(key)
+        except Exception as e:
+            with self._lock:
+                del self._pending[key]
+                self.build_errors += 1
+            pending.error = e
+            pending.event.set()
+            raise
+
+        with self._lock:
+            self._engines[key] = engine
+            del self._pending[key]
+            self._evict_locked()
+
+        pending.engine = engine
+        pending.event.set()
+        return engine
+
+    def _evict_locked(self):
+        while len(self._engines) > self.max_engines:
+            self._engines.popitem(last=False)
+            self.evictions += 1
+
+        # RSS ne pada odmah posle oslobađanja - izbaci najviše jedan po izgradnji
+        if (self.memory_budget_mb and len(self._engines) > 1
+                and current_rss_mb() > self.memory_budget_mb):
+            self._engines.popitem(last=False)
+            self.evictions += 1
+
+    def evict(self, key: str) -> bool:
+        with self._lock:
+            if self._engines.pop(key, None) is not None:
+                self.evictions += 1
+                return True
+            return False
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._engines
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'engines': len(self._engines),
+                'max_engines': self.max_engines,
+                'memory_budget_mb': self.memory_budget_mb,
+                'rss_mb': round(current_rss_mb(), 1),
+                'hits': self.hits,
+                'misses': self.misses,
+                'waits': self.waits,
+                'evictions': self.evictions,
+                'build_errors': self.build_errors
+            }
@@ -0,0 +1,234 @@
+"""
+Fuseki Sync
+Delta sinhronizacija semantičkog grafa ka Fuseki (outbox žurnal + high-water mark)
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from rdflib import BNode, Graph
+
+from graph_journal import file_lock
+
+
+NT_CONTENT_TYPE = 'application/n-triples'
+
+
+def _nt_lines(triples) -> List[str]:
+    """
+    N-Triples linije preko rdflib nt serializer-a (kao GraphJournal.append):
+    jedna linija = tačno jedan triple, novi redovi i navodnici u literalima
+    su escape-ovani (n3() bi višelinijski literal upisao u više linija)
+    """
+    batch = Graph()
+    for triple in triples:
+        batch.add(triple)
+    return [line + '\n' for line in batch.serialize(format='nt').split('\n') if line.strip()]
+
+
+class SyncOutbox:
+    """
+    Outbox za delta sync: svaki upis u graf dopisuje se kao N-Triples linije
+    u <name>.outbox.nt, a <name>.outbox.offset čuva bajt-offset do kog je
+    outbox uspešno poslat (high-water mark).
+
+    sync() šalje samo linije posle offset-a, u batch-evima od batch_triples,
+    kroz Graph Store Protocol POST na /{dataset}/data; offset se atomično
+    upisuje posle svakog uspešnog batch-a, pa se prekinut sync nastavlja od
+    poslednjeg potvrđenog batch-a. Kada je sve poslato, outbox se prazni.
+
+    Prvi sync (offset ne postoji) šalje ceo graf ovog procesa u batch-evima
+    (triple-ovi sa blank node-ovima idu u jednom batch-u da bi labele ostale
+    povezane), a zatim ceo outbox od početka - outbox dele svi worker-i, pa
+    tako stižu i upisi drugih procesa koji nisu u ovom grafu (duplikati su
+    bezopasni, POST na graf je unija).
+    """
+
+    def __init__(self, data_dir='data', name='semantic-graph', batch_triples=5000, timeout=60):
+        """
+        Args:
+            data_dir: Direktorijum za outbox i offset fajl
+            name: Osnovno ime fajlova
+            batch_triples: Maksimalan broj triple-ova po POST zahtevu
+            timeout: Timeout HTTP poziva (sekunde)
+        """
+        self.batch_triples = batch_triples
+        self.timeout = timeout
+
+        self.path = os.path.join(data_dir, f'{name}.outbox.nt')
+        self.offset_path = os.path.join(data_dir, f'{name}.outbox.offset')
+        self._append_lock_path = os.path.join(data_dir, f'{name}.outbox.lock')
+        self._sync_lock_path = os.path.join(data_dir, f'{name}.sync.lock')
+
+        os.makedirs(data_dir, exist_ok=True)
+
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+        self._stats_lock = threading.Lock()
+        self.recorded_triples = 0
+        self.synced_triples = 0
+        self.syncs = 0
+        self.failed_syncs = 0
+
+    def append(self, triples):
+        """
+        Dopisuje nove triple-ove u outbox
+        """
+        lines = _nt_lines(triples)
+        if not lines:
+            return
+        data = ''.join(lines)
+
+        with file_lock(self._append_lock_path, exclusive=False):
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+
+        with self._stats_lock:
+            self.recorded_triples += len(lines)
+
+    def _read_offset(self) -> Optional[int]:
+        try:
+            with open(self.offset_path) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return None
+
+    def _write_offset(self, offset: int):
+        tmp_path = self.offset_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.offset_path)
+
+    def _outbox_size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def _post(self, url: str, data: str):
+        response = self.session.post(
+            url,
+            data=data.encode('utf-8'),
+            headers={'Content-Type': NT_CONTENT_TYPE},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+    def _send_full(self, url: str, triples: Iterable) -> int:
+        """
+        Inicijalni sync: ceo graf u batch-evima (blank node triple-ovi zajedno)
+        """
+        bnode_triples, batch, sent = [], [], 0
+        for triple in triples:
+            if any(isinstance(term, BNode) for term in triple):
+                bnode_triples.append(triple)
+                continue
+            batch.append(triple)
+            if len(batch) >= self.batch_triples:
+                sent += self._post_triples(url, batch)
+                batch = []
+
+        for batch in (batch, bnode_triples):
+            if batch:
+                sent += self._post_triples(url, batch)
+        return sent
+
+    def _post_triples(self, url: str, triples) -> int:
+        lines = _nt_lines(triples)
+        self._post(url, ''.join(lines))
+        return len(lines)
+
+    def sync(self, url: str, graph_triples: Callable[[], Iterable]) -> Optional[Dict[str, Any]]:
+        """
+        Šalje sve što nije poslato od poslednjeg uspešnog sync-a
+
+        Args:
+            url: Graph Store endpoint (npr. http://fuseki:3030/lms-tools/data)
+            graph_triples: Vraća sve triple-ove grafa - koristi se samo pri prvom sync-u
+
+        Returns:
+            {'sent': broj triple-ova, 'full': da li je bio inicijalni sync}
+            ili None ako drugi proces već radi sync
+        """
+        with file_lock(self._sync_lock_path, exclusive=True, blocking=False) as acquired:
+            if not acquired:
+                return None
+
+            sent = 0
+            full = False
+            try:
+                offset = self._read_offset()
+                if offset is None:
+                    # Lokalni graf ne sadrži upise drugih worker-a - outbox se šalje od 0
+                    full = True
+                    sent += self._send_full(url, graph_triples())
+                    offset = 0
+                    self._write_offset(offset)
+                elif offset > self._outbox_size():
+                    # Offset iza kraja fajla (prekid pre upisa offset-a 0) - šalje se ceo outbox
+                    offset = 0
+
+                sent += self._send_outbox(url, offset)
+            except Exception:
+                with self._stats_lock:
+                    self.synced_triples += sent
+                    self.failed_syncs += 1
+                raise
+
+            with self._stats_lock:
+                self.synced_triples += sent
+                self.syncs += 1
+            return {'sent': sent, 'full': full}
+
+    def _send_outbox(self, url: str, offset: int) -> int:
+        sent = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                while True:
+                    lines = []
+                    size = 0
+                    while len(lines) < self.batch_triples:
+                        line = f.readline()
+                        if not line.endswith(b'\n'):
+                            break  # kraj fajla ili nedovršen upis
+                        lines.append(line)
+                        size += len(line)
+                    if not lines:
+                        break
+
+                    self._post(url, b''.join(lines).decode('utf-8'))
+                    offset += size
+                    sent += len(lines)
+                    self._write_offset(offset)
+                    f.seek(offset)
+
+        # Sve je poslato - isprazni outbox. Offset 0 se upisuje pre skraćivanja:
+        # prekid između dva koraka samo ponovo šalje outbox (idempotentno), dok bi
+        # obrnut redosled ostavio offset veći od praznog fajla i preskočio nove upise
+        with file_lock(self._append_lock_path, exclusive=True):
+            if offset and self._outbox_size() == offset:
+                self._write_offset(0)
+                with open(self.path, 'w'):
+                    pass
+        return sent
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            offset = self._read_offset()
+            return {
+                'recorded_triples': self.recorded_triples,
+                'synced_triples': self.synced_triples,
+                'pending_bytes': self._outbox_size() - (offset or 0),
+                'initial_sync_done': offset is not None,
+                'syncs': self.syncs,
+                'failed_syncs': self.failed_syncs
+            }
@@ -0,0 +1,213 @@
+"""
+Graph Journal
+Inkrementalna (append-only) perzistencija RDF grafa: Turtle snapshot + N-Triples žurnal
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+from rdflib import Graph
+
+try:
+    import fcntl
+except ImportError:  # Windows - bez međuprocesnog zaključavanja
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path, exclusive=True, blocking=True):
+    """
+    Međuprocesni flock na lock fajlu; sa blocking=False vraća False ako je zauzet
+    """
+    if fcntl is None:
+        yield True
+        return
+
+    with open(path, 'a') as lock_file:
+        flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(lock_file, flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class GraphJournal:
+    """
+    Svaki upis dodaje samo nove triple-ove na kraj N-Triples žurnala (O(1) po upisu).
+    Kompakcija u pozadini spaja snapshot i žurnal u novi snapshot:
+
+        1. žurnal se (pod ekskluzivnim lock-om) preimenuje u *.compacting.nt
+        2. novi snapshot = stari snapshot (ili ontologija) + preimenovani žurnal
+        3. atomični os.replace snapshot-a, brisanje preimenovanog žurnala
+
+    Kompakcija radi samo nad fajlovima na disku, pa je ispravna i kada više
+    gunicorn worker-a piše u isti žurnal. Pri startu se učitava snapshot,
+    pa preostali *.compacting.nt (ako je kompakcija prekinuta), pa žurnal.
+    """
+
+    def __init__(self, data_dir='data', name='semantic-graph', ontology_file=None,
+                 compact_every=10000):
+        """
+        Args:
+            data_dir: Direktorijum za snapshot i žurnal
+            name: Osnovno ime fajlova
+            ontology_file: Ontologija koja je osnova grafa ako snapshot još ne postoji
+            compact_every: Posle koliko upisanih triple-ova pokrenuti kompakciju
+        """
+        self.ontology_file = ontology_file
+        self.compact_every = compact_every
+
+        self.snapshot_path = os.path.join(data_dir, f'{name}.ttl')
+        self.journal_path = os.path.join(data_dir, f'{name}.journal.nt')
+        self.compacting_path = os.path.join(data_dir, f'{name}.journal.compacting.nt')
+        self._append_lock_path = os.path.join(data_dir, f'{name}.journal.lock')
+        self._compact_lock_path = os.path.join(data_dir, f'{name}.compact.lock')
+
+        os.makedirs(data_dir, exist_ok=True)
+
+        self._pending_triples = 0
+        self._compaction_thread = None
+        self._thread_lock = threading.Lock()
+
+        self.appended_triples = 0
+        self.compactions = 0
+        self.skipped_lines = 0
+
+    def load_into(self, graph: Graph) -> bool:
+        """
+        Učitava snapshot + žurnal u graf
+
+        Returns:
+            True ako je snapshot postojao (ontologija je već u njemu)
+        """
+        with file_lock(self._compact_lock_path, exclusive=False):
+            has_snapshot = os.path.exists(self.snapshot_path)
+            if has_snapshot:
+                graph.parse(self.snapshot_path, format='turtle')
+            elif self.ontology_file and os.path.exists(self.ontology_file):
+                graph.parse(self.ontology_file, format='turtle')
+            elif self.ontology_file:
+                print(f"Warning: Ontology file {self.ontology_file} not found. Starting with empty graph.")
+
+            for path in (self.compacting_path, self.journal_path):
+                if os.path.exists(path):
+                    self._pending_triples += self._replay(graph, path)
+
+        return has_snapshot
+
+    def _replay(self, graph: Graph, path) -> int:
+        """
+        Učitava N-Triples žurnal; oštećene linije (npr. nedovršen upis pri padu) se preskaču
+        """
+        with open(path, encoding='utf-8') as f:
+            lines = f.readlines()
+
+        try:
+            graph.parse(data=''.join(lines), format='nt')
+        except Exception:
+            for line in lines:
+                try:
+                    graph.parse(data=line, format='nt')
+                except Exception:
+                    self.skipped_lines += 1
+            print(f"Warning: skipped {self.skipped_lines} corrupt journal lines in {path}")
+
+        return len(lines)
+
+    def append(self, triples):
+        """
+        Dodaje triple-ove na kraj žurnala
+        """
+        triples = list(triples)
+        if not triples:
+            return
+
+        batch = Graph()
+        for triple in triples:
+            batch.add(triple)
+        data = batch.serialize(format='nt')
+
+        with file_lock(self._append_lock_path, exclusive=False):
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+
+        with self._thread_lock:
+            self.appended_triples += len(triples)
+            self._pending_triples += len(triples)
+            should_compact = self._pending_triples >= self.compact_every
+
+        if should_compact:
+            self.compact_in_background()
+
+    def compact_in_background(self):
+        with self._thread_lock:
+            if self._compaction_thread and self._compaction_thread.is_alive():
+                return
+            self._pending_triples = 0
+            self._compaction_thread = threading.Thread(
+                target=self.compact, name='graph-journal-compaction', daemon=True
+            )
+            self._compaction_thread.start()
+
+    def compact(self) -> bool:
+        """
+        Spaja snapshot i žurnal u novi snapshot
+        """
+        with file_lock(self._compact_lock_path, exclusive=True, blocking=False) as acquired:
+            if not acquired:
+                return False  # drugi proces već radi kompakciju
+
+            try:
+                # 1. Rotiraj žurnal (kratko, blokira samo upise)
+                if not os.path.exists(self.compacting_path):
+                    with file_lock(self._append_lock_path, exclusive=True):
+                        if not os.path.exists(self.journal_path):
+                            return True
+                        os.replace(self.journal_path, self.compacting_path)
+
+                # 2. Novi snapshot van lock-a za upise
+                merged = Graph()
+                if os.path.exists(self.snapshot_path):
+                    merged.parse(self.snapshot_path, format='turtle')
+                elif self.ontology_file and os.path.exists(self.ontology_file):
+                    merged.parse(self.ontology_file, format='turtle')
+                self._replay(merged, self.compacting_path)
+
+                tmp_path = self.snapshot_path + '.tmp'
+                merged.serialize(destination=tmp_path, format='turtle')
+                os.replace(tmp_path, self.snapshot_path)
+                os.remove(self.compacting_path)
+
+                with self._thread_lock:
+                    self._pending_triples = 0
+                self.compactions += 1
+                print(f"✓ Semantic graph compacted ({len(merged)} triples)")
+                return True
+            except Exception as e:
+                print(f"Error compacting semantic graph: {e}")
+                return False
+
+    def close(self, timeout=None):
+        """
+        Čeka da se pozadinska kompakcija završi
+        """
+        thread = self._compaction_thread
+        if thread and thread.is_alive():
+            thread.join(timeout)
+
+    def stats(self):
+        return {
+            'appended_triples': self.appended_triples,
+            'pending_triples': self._pending_triples,
+            'compactions': self.compactions,
+            'skipped_lines': self.skipped_lines
+        }
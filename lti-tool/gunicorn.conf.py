@@ -0,0 +1,29 @@
+"""
+Gunicorn konfiguracija
+
+gthread worker-i: jedan proces drži više pitanja koja čekaju na Ollama
+(svako u svom thread-u), umesto da svako pitanje blokira ceo sync worker.
+Broj istovremenih LLM poziva ograničava OllamaClient (OLLAMA_MAX_CONCURRENCY).
+"""
+
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+# Dugi timeout zbog upload-a velikih materijala i streaming odgovora
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 600))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 600))
+keepalive = 5
+
+
+def worker_exit(server, worker):
+    """
+    Pre gašenja worker-a isprazni write-behind red semantic layer-a
+    """
+    import sys
+    app_module = sys.modules.get('app')
+    if app_module is not None and hasattr(app_module, 'shutdown'):
+        app_module.shutdown()
@@ -0,0 +1,459 @@
+"""
+Ingestion
+Pozadinski red za obradu upload-ovanih materijala (ekstrakcija teksta, chunking, embedding)
+"""
+
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from graph_journal import file_lock
+
+
+SUPPORTED_TYPES = ('txt', 'md', 'pdf', 'docx')
+TERMINAL_STATES = ('done', 'failed')
+
+# Paralelna ekstrakcija PDF-a: broj procesa i broj strana po zadatku
+EXTRACT_PROCESSES = int(os.environ.get('EXTRACT_PROCESSES', os.cpu_count() or 1))
+PDF_PAGES_PER_TASK = int(os.environ.get('PDF_PAGES_PER_TASK', 16))
+
+_STOP = object()
+
+
+class ExtractionError(ValueError):
+    """
+    Fajl nije mogao biti pročitan ili je prazan
+    """
+
+
+# Process-wide pool za ekstrakciju (CPU-bound, van GIL-a)
+_extraction_pool = None
+_extraction_pool_lock = threading.Lock()
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """
+    Factory funkcija - vraća zajednički process pool za ekstrakciju teksta
+
+    Koristi se 'spawn' jer fork iz procesa sa više thread-ova (gunicorn gthread) nije bezbedan.
+    """
+    global _extraction_pool
+    if _extraction_pool is None:
+        with _extraction_pool_lock:
+            if _extraction_pool is None:
+                _extraction_pool = ProcessPoolExecutor(
+                    max_workers=EXTRACT_PROCESSES,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _extraction_pool
+
+
+def _read_pdf_range(pdf, start: int, end: int) -> List[Tuple[int, str]]:
+    pages = []
+    for page_num in range(start, min(end, len(pdf.pages))):
+        try:
+            text = pdf.pages[page_num].extract_text()
+            if text and text.strip():
+                pages.append((page_num + 1, text))
+        except Exception as e:
+            print(f"Warning: error extracting page {page_num}: {e}")
+    return pages
+
+
+def _extract_pdf_range(path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    Izvlači tekst strana [start, end) - izvršava se u procesu iz pool-a
+
+    Proces sam otvara fajl i čita samo objekte svojih strana; kroz pool se
+    šalje putanja umesto celog PDF-a.
+    """
+    from PyPDF2 import PdfReader
+
+    with open(path, 'rb') as f:
+        return _read_pdf_range(PdfReader(f), start, end)
+
+
+def _extract_pdf_pages(path: str, parallel: bool) -> List[Tuple[int, str]]:
+    from PyPDF2 import PdfReader
+
+    with open(path, 'rb') as f:
+        pdf = PdfReader(f)
+        page_count = len(pdf.pages)
+        if not parallel or EXTRACT_PROCESSES <= 1 or page_count <= PDF_PAGES_PER_TASK:
+            return _read_pdf_range(pdf, 0, page_count)
+
+    # Opsezi strana idu u pool; map čuva redosled strana
+    starts = range(0, page_count, PDF_PAGES_PER_TASK)
+    ranges = get_extraction_pool().map(
+        _extract_pdf_range,
+        [path] * len(starts),
+        starts,
+        [start + PDF_PAGES_PER_TASK for start in starts]
+    )
+    return [page for pages in ranges for page in pages]
+
+
+def extract_pages(path: str, ext: str, parallel: bool = True) -> List[Tuple[Optional[int], str]]:
+    """
+    Izvlači tekst iz TXT, MD, PDF ili DOCX fajla kao listu (broj strane, tekst)
+
+    Strane PDF-a se dele na opsege od PDF_PAGES_PER_TASK i obrađuju u process
+    pool-u (parallel=False - sve u tekućem procesu). Za ostale formate vraća
+    jedan deo bez broja strane.
+    """
+    if ext in ('txt', 'md'):
+        with open(path, 'rb') as f:
+            pages = [(None, f.read().decode('utf-8', errors='ignore'))]
+
+    elif ext == 'pdf':
+        try:
+            pages = _extract_pdf_pages(path, parallel)
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            raise ExtractionError(f'PDF greška: {str(e)}') from e
+
+        if not pages:
+            raise ExtractionError('PDF je prazan ili nije mogao biti pročitan')
+
+    elif ext == 'docx':
+        try:
+            from docx import Document
+
+            doc = Document(path)
+            paragraphs = [para.text for para in doc.paragraphs if para.text.strip()]
+            pages = [(None, '\n\n'.join(paragraphs))]
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            raise ExtractionError(f'DOCX greška: {str(e)}') from e
+
+        if not pages[0][1].strip():
+            raise ExtractionError('DOCX je prazan')
+
+    else:
+        raise ExtractionError(f'Nepodržan format: {ext}')
+
+    if not any(text.strip() for _, text in pages):
+        raise ExtractionError('Fajl je prazan ili nečitljiv')
+    return pages
+
+
+def join_pages(pages: List[Tuple[Optional[int], str]]) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    Spaja strane u jedan tekst
+
+    Returns:
+        (tekst, [(offset početka strane u tekstu, broj strane), ...])
+    """
+    parts, page_starts, offset = [], [], 0
+    for page_number, text in pages:
+        if page_number is not None:
+            page_starts.append((offset, page_number))
+        parts.append(text)
+        offset += len(text) + 2
+    return '\n\n'.join(parts), page_starts
+
+
+def extract_text(path: str, ext: str) -> str:
+    """
+    Izvlači tekst iz TXT, MD, PDF ili DOCX fajla
+    """
+    return join_pages(extract_pages(path, ext))[0]
+
+
+def extract_file(path: str) -> Tuple[List[Tuple[Optional[int], str]], Optional[str]]:
+    """
+    Ekstrakcija celog fajla u jednom procesu (za paralelnu obradu više fajlova)
+
+    Returns:
+        (strane, greška)
+    """
+    ext = path.rsplit('.', 1)[-1].lower()
+    try:
+        return extract_pages(path, ext, parallel=False), None
+    except ExtractionError as e:
+        return [], str(e)
+
+
+class IngestionQueue:
+    """
+    Red poslova za obradu materijala sa lokalnim pool-om worker thread-ova.
+
+    Upload samo upiše fajl i status posla u jobs_dir i odmah vrati job_id;
+    worker prolazi kroz faze queued -> extracting -> indexing -> done/failed
+    i ažurira status (chunks_done/chunks_total, chunks/s, greška) na disku,
+    pa status vidi svaki gunicorn worker. Posao se preuzima ne-blokirajućim
+    flock-om na <job_id>.claim, koji se oslobađa i kada proces padne -
+    nedovršeni poslovi se ponovo preuzimaju pri startu i periodičnom skeniranju.
+    """
+
+    def __init__(self, rag_factory: Callable[[str], Any], jobs_dir: str = 'data/ingest-jobs',
+                 workers: int = 2, max_attempts: int = 3, retention_hours: float = 24,
+                 rescan_interval: float = 60):
+        """
+        Args:
+            rag_factory: Funkcija course_id -> RAGEngine (get_rag_engine)
+            jobs_dir: Direktorijum za upload-ovane fajlove i statuse poslova
+            workers: Broj worker thread-ova
+            max_attempts: Posle koliko prekinutih pokušaja posao postaje failed
+            retention_hours: Koliko dugo se čuva status završenog posla
+            rescan_interval: Koliko često worker traži napuštene poslove (sekunde)
+        """
+        self.rag_factory = rag_factory
+        self.jobs_dir = jobs_dir
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_hours * 3600
+        self.rescan_interval = rescan_interval
+
+        os.makedirs(jobs_dir, exist_ok=True)
+
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+        self._rescan()
+
+        self._workers = [
+            threading.Thread(target=self._run, name=f'ingestion-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.jobs_dir, f'{job_id}.{suffix}')
+
+    def _write_status(self, job: Dict[str, Any]):
+        path = self._path(job['job_id'], 'json')
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Status posla (čita se sa diska - radi iz bilo kog procesa)
+        """
+        if not job_id or os.sep in job_id or job_id.startswith('.'):
+            return None
+        try:
+            with open(self._path(job_id, 'json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def submit(self, data: bytes, filename: str, course_id: str) -> Dict[str, Any]:
+        """
+        Upisuje fajl i status posla na disk i stavlja posao u red
+
+        Raises:
+            ExtractionError: Nepodržan format fajla
+        """
+        ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        if ext not in SUPPORTED_TYPES:
+            raise ExtractionError(f'Nepodržan format: {ext}')
+
+        job_id = uuid.uuid4().hex
+        with open(self._path(job_id, 'upload'), 'wb') as f:
+            f.write(data)
+
+        job = {
+            'job_id': job_id,
+            'course_id': course_id,
+            'filename': filename,
+            'file_type': ext,
+            'size': len(data),
+            'state': 'queued',
+            'chunks_done': 0,
+            'chunks_total': 0,
+            'chunks_per_sec': 0.0,
+            'attempts': 0,
+            'error': None,
+            'created_at': datetime.utcnow().isoformat(),
+            'started_at': None,
+            'finished_at': None
+        }
+        self._write_status(job)
+
+        with self._lock:
+            self.submitted += 1
+        self._enqueue(job_id)
+        return job
+
+    def _enqueue(self, job_id: str):
+        with self._lock:
+            if job_id in self._queued:
+                return
+            self._queued.add(job_id)
+        self._queue.put(job_id)
+
+    def _rescan(self):
+        """
+        Stavlja u red nedovršene poslove (npr. posle restarta) i briše stare statuse
+        """
+        now = time.time()
+        for name in os.listdir(self.jobs_dir):
+            if not name.endswith('.json'):
+                continue
+            job_id = name[:-len('.json')]
+            job = self.get(job_id)
+            if job is None:
+                continue
+
+            if job['state'] not in TERMINAL_STATES:
+                self._enqueue(job_id)
+            elif now - os.path.getmtime(self._path(job_id, 'json')) > self.retention_seconds:
+                for suffix in ('json', 'claim'):
+                    try:
+                        os.remove(self._path(job_id, suffix))
+                    except FileNotFoundError:
+                        pass
+
+    def _run(self):
+        while True:
+            try:
+                job_id = self._queue.get(timeout=self.rescan_interval)
+            except queue.Empty:
+                if not self._closed:
+                    self._rescan()
+                continue
+
+            if job_id is _STOP:
+                return
+
+            with self._lock:
+                self._queued.discard(job_id)
+
+            try:
+                self._process(job_id)
+            except Exception as e:
+                print(f"Error processing ingestion job {job_id}: {e}")
+
+    def _process(self, job_id: str):
+        with file_lock(self._path(job_id, 'claim'), exclusive=True, blocking=False) as claimed:
+            if not claimed:
+                return  # posao obrađuje drugi proces
+
+            job = self.get(job_id)
+            if job is None or job['state'] in TERMINAL_STATES:
+                return
+
+            job['attempts'] += 1
+            if job['attempts'] > self.max_attempts:
+                self._finish(job, error='Obrada je prekinuta previše puta')
+                return
+
+            job.update(state='extracting', started_at=datetime.utcnow().isoformat(), error=None)
+            self._write_status(job)
+
+            try:
+                pages = extract_pages(self._path(job_id, 'upload'), job['file_type'])
+                content, page_starts = join_pages(pages)
+            except ExtractionError as e:
+                self._finish(job, error=str(e))
+                return
+            except FileNotFoundError:
+                self._finish(job, error='Upload-ovani fajl više ne postoji')
+                return
+
+            job.update(state='indexing', chars=len(content), pages=len(page_starts))
+            self._write_status(job)
+            indexing_started = time.perf_counter()
+
+            def progress(done, total):
+                elapsed = time.perf_counter() - indexing_started
+                job.update(
+                    chunks_done=done,
+                    chunks_total=total,
+                    chunks_per_sec=round(done / elapsed, 1) if elapsed > 0 else 0.0
+                )
+                self._write_status(job)
+
+            # Neočekivana greška završava posao (inače ostaje u 'indexing' do max_attempts)
+            try:
+                rag = self.rag_factory(job['course_id'])
+                success = rag.add_document(content, {
+                    'filename': job['filename'],
+                    'course_id': job['course_id'],
+                    'file_type': job['file_type']
+                }, progress=progress, page_starts=page_starts, file_size=job['size'])
+            except Exception as e:
+                print(f"Error indexing ingestion job {job_id}: {e}")
+                self._finish(job, error=f'Greška pri indeksiranju: {e}')
+                return
+
+            if success:
+                stats = rag.last_ingest_stats
+                job.update({key: stats.get(key, 0) for key in ('embedded', 'reused', 'unchanged', 'deleted')})
+                self._finish(job)
+            else:
+                error = rag.last_ingest_stats.get('error', 'Upload u ChromaDB nije uspeo')
+                self._finish(job, error=error)
+
+    def _finish(self, job: Dict[str, Any], error: Optional[str] = None):
+        job.update(
+            state='failed' if error else 'done',
+            error=error,
+            finished_at=datetime.utcnow().isoformat()
+        )
+        self._write_status(job)
+
+        # Status je već završen, pa claim i upload više nisu potrebni
+        for suffix in ('upload', 'claim'):
+            try:
+                os.remove(self._path(job['job_id'], suffix))
+            except FileNotFoundError:
+                pass
+
+        with self._lock:
+            if error:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+        if error:
+            print(f"✗ Ingestion job {job['job_id']} ({job['filename']}) failed: {error}")
+        else:
+            print(f"✓ Ingestion job {job['job_id']} ({job['filename']}): "
+                  f"{job['chunks_total']} chunks, {job['chunks_per_sec']} chunks/s")
+
+    def close(self, timeout: float = 30):
+        """
+        Zaustavlja worker-e (posao u toku se završava, ostali ostaju na disku)
+        """
+        if self._closed:
+            return
+        self._closed = True
+
+        # Poslovi koji još čekaju ostaju na disku i preuzimaju se pri sledećem startu
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        for _ in self._workers:
+            self._queue.put(_STOP)
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'workers': len(self._workers),
+                'queued': self._queue.qsize(),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed
+            }
@@ -0,0 +1,336 @@
+"""
+Lexical Index
+BM25 inverted indeks po kursu na disku (segmenti + memory-mapped postings)
+"""
+
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from graph_journal import file_lock
+from text_utils import tokenize
+
+
+def index_terms(text: str, stem_len: int = 6) -> List[str]:
+    """
+    Termini za indeks i upit: fold (ćirilica/dijakritici) + grubi stemming;
+    tehnički termini sa tačkom/crticom ("1.3", "x-api") ostaju celi
+    """
+    return tokenize(text, min_len=2, stem_len=stem_len)
+
+
+class _Segment:
+    """
+    Nepromenljiv segment indeksa:
+
+        <name>.terms.json   {term: [offset, df]} - opseg u postings nizovima
+        <name>.ids.json     chunk id-jevi (redni broj = doc u segmentu)
+        <name>.docs.npy     int32 doc za svaki posting      (mmap)
+        <name>.tfs.npy      float32 term frequency          (mmap)
+        <name>.lens.npy     float32 dužina dokumenta        (mmap)
+        <name>.deleted.npy  bool tombstone po dokumentu     (mmap r+, deli se između procesa)
+    """
+
+    def __init__(self, base: str):
+        self.base = base
+        with open(base + '.terms.json', encoding='utf-8') as f:
+            self.terms = json.load(f)
+        with open(base + '.ids.json', encoding='utf-8') as f:
+            self.ids = json.load(f)
+        self.docs = np.load(base + '.docs.npy', mmap_mode='r')
+        self.tfs = np.load(base + '.tfs.npy', mmap_mode='r')
+        self.lens = np.load(base + '.lens.npy', mmap_mode='r')
+        self.deleted = np.load(base + '.deleted.npy', mmap_mode='r+')
+
+    @staticmethod
+    def write(base: str, documents: List[Tuple[str, List[str]]]):
+        """
+        Piše segment od [(chunk_id, termini), ...]
+        """
+        postings = {}
+        lens = np.zeros(len(documents), dtype=np.float32)
+        for doc, (_, terms) in enumerate(documents):
+            lens[doc] = len(terms)
+            for term, tf in Counter(terms).items():
+                postings.setdefault(term, []).append((doc, tf))
+
+        terms, docs, tfs, offset = {}, [], [], 0
+        for term in sorted(postings):
+            entries = postings[term]
+            terms[term] = [offset, len(entries)]
+            docs.extend(doc for doc, _ in entries)
+            tfs.extend(tf for _, tf in entries)
+            offset += len(entries)
+
+        np.save(base + '.docs.npy', np.asarray(docs, dtype=np.int32))
+        np.save(base + '.tfs.npy', np.asarray(tfs, dtype=np.float32))
+        np.save(base + '.lens.npy', lens)
+        np.save(base + '.deleted.npy', np.zeros(len(documents), dtype=bool))
+        with open(base + '.ids.json', 'w', encoding='utf-8') as f:
+            json.dump([chunk_id for chunk_id, _ in documents], f, ensure_ascii=False)
+        with open(base + '.terms.json', 'w', encoding='utf-8') as f:
+            json.dump(terms, f, ensure_ascii=False)
+
+    def live_documents(self) -> Iterable[Tuple[str, List[str]]]:
+        """
+        Živi dokumenti kao (chunk_id, termini) - za spajanje segmenata
+        """
+        terms_by_doc = [[] for _ in self.ids]
+        for term, (offset, count) in self.terms.items():
+            for doc, tf in zip(self.docs[offset:offset + count], self.tfs[offset:offset + count]):
+                terms_by_doc[doc].extend([term] * int(tf))
+        for doc, chunk_id in enumerate(self.ids):
+            if not self.deleted[doc]:
+                yield chunk_id, terms_by_doc[doc]
+
+    def remove_files(self):
+        for suffix in ('.terms.json', '.ids.json', '.docs.npy', '.tfs.npy', '.lens.npy', '.deleted.npy'):
+            try:
+                os.remove(self.base + suffix)
+            except FileNotFoundError:
+                pass
+
+
+class LexicalIndex:
+    """
+    BM25 indeks chunk-ova jednog kursa, inkrementalan kao LSM:
+
+    - svaki add_document upisuje nove chunk-ove kao novi nepromenljivi segment
+    - obrisani/zamenjeni chunk-ovi se samo označe u tombstone nizu segmenta
+      (memory-mapped, pa izmena odmah važi i za ostale gunicorn worker-e)
+    - kada segmenata ima više od max_segments, spajaju se u jedan bez
+      obrisanih dokumenata
+
+    Spisak živih segmenata je u segments.json (atomičan upis); izmene idu
+    pod flock-om, a pretraga bez lock-a nad mmap-ovanim nizovima, pa odgovara
+    u milisekundama. Ako indeks ne postoji, gradi se jednom kroz `backfill`.
+    """
+
+    def __init__(self, index_dir: str, backfill: Callable[[], List[Tuple[str, str]]],
+                 max_segments: int = 8, k1: float = 1.2, b: float = 0.75, stem_len: int = 6):
+        """
+        Args:
+            index_dir: Direktorijum indeksa kursa
+            backfill: Vraća [(chunk_id, tekst), ...] iz vector store-a za inicijalni indeks
+            max_segments: Posle koliko segmenata se radi spajanje
+            k1, b: BM25 parametri
+            stem_len: Dužina stem-a za termine (vidi text_utils.tokenize)
+        """
+        self.index_dir = index_dir
+        self._backfill = backfill
+        self.max_segments = max_segments
+        self.k1 = k1
+        self.b = b
+        self.stem_len = stem_len
+
+        self.segments_path = os.path.join(index_dir, 'segments.json')
+        self._lock_path = os.path.join(index_dir, 'index.lock')
+        os.makedirs(index_dir, exist_ok=True)
+
+        self._state_lock = threading.Lock()
+        self._state_key = None
+        self._segments = []  # [_Segment, ...]
+        self._positions = {}  # chunk_id -> [(segment, doc), ...]
+
+        self._stats_lock = threading.Lock()
+        self.queries = 0
+        self.total_ms = 0.0
+
+    # ---- stanje na disku ----
+
+    def _stat_key(self):
+        try:
+            st = os.stat(self.segments_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _refresh(self) -> bool:
+        """
+        Ponovo učitava segmente ako se segments.json promenio; False ako indeks ne postoji
+        """
+        key = self._stat_key()
+        if key is None:
+            return False
+        with self._state_lock:
+            if key == self._state_key:
+                return True
+            with open(self.segments_path, encoding='utf-8') as f:
+                names = json.load(f)['segments']
+            segments = [_Segment(os.path.join(self.index_dir, name)) for name in names]
+            positions = {}
+            for segment in segments:
+                for doc, chunk_id in enumerate(segment.ids):
+                    positions.setdefault(chunk_id, []).append((segment, doc))
+            self._segments, self._positions, self._state_key = segments, positions, key
+        return True
+
+    def _write_segments(self, names: List[str]):
+        tmp_path = f"{self.segments_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'segments': names}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.segments_path)
+
+    def _new_segment(self, documents: List[Tuple[str, List[str]]]) -> str:
+        name = f"seg_{uuid.uuid4().hex[:12]}"
+        _Segment.write(os.path.join(self.index_dir, name), documents)
+        return name
+
+    def _segment_names(self) -> List[str]:
+        return [os.path.basename(segment.base) for segment in self._segments]
+
+    def _ensure_locked(self):
+        """
+        Poziva se pod flock-om: učitava indeks, a ako ne postoji gradi ga iz vector store-a
+        """
+        if self._refresh():
+            return
+        documents = [(chunk_id, index_terms(text, self.stem_len)) for chunk_id, text in self._backfill()]
+        names = [self._new_segment(documents)] if documents else []
+        self._write_segments(names)
+        self._refresh()
+        print(f"✓ Lexical index built: {self.index_dir} ({len(documents)} chunks)")
+
+    def _is_live(self, chunk_id: str) -> bool:
+        return any(not segment.deleted[doc] for segment, doc in self._positions.get(chunk_id, ()))
+
+    # ---- izmene ----
+
+    def update(self, add: List[Tuple[str, str]] = (), delete: Iterable[str] = ()):
+        """
+        Dodaje chunk-ove [(chunk_id, tekst), ...] kao novi segment (već indeksirani
+        id-jevi se preskaču - id je hash sadržaja) i označava obrisane id-jeve
+        """
+        with file_lock(self._lock_path):
+            self._ensure_locked()
+
+            touched = set()
+            for chunk_id in delete:
+                for segment, doc in self._positions.get(chunk_id, ()):
+                    if not segment.deleted[doc]:
+                        segment.deleted[doc] = True
+                        touched.add(segment)
+            for segment in touched:
+                segment.deleted.flush()
+
+            documents = [(chunk_id, index_terms(text, self.stem_len))
+                         for chunk_id, text in add if not self._is_live(chunk_id)]
+            if not documents:
+                return
+
+            self._write_segments(self._segment_names() + [self._new_segment(documents)])
+            self._refresh()
+            if len(self._segments) > self.max_segments:
+                self._merge_locked()
+
+    def _merge_locked(self):
+        """
+        Spaja sve segmente u jedan, bez obrisanih dokumenata
+        """
+        old_segments = list(self._segments)
+        documents = [doc for segment in old_segments for doc in segment.live_documents()]
+        names = [self._new_segment(documents)] if documents else []
+        self._write_segments(names)
+        self._refresh()
+        # Procesi koji još drže stare mmap-ove čitaju ih dok ne osveže stanje (Linux unlink)
+        for segment in old_segments:
+            segment.remove_files()
+        print(f"✓ Lexical index merged: {len(old_segments)} segments -> {len(names)} ({len(documents)} chunks)")
+
+    def invalidate(self):
+        """
+        Briše spisak segmenata - indeks se ponovo gradi iz vector store-a
+        """
+        with file_lock(self._lock_path):
+            try:
+                os.remove(self.segments_path)
+            except FileNotFoundError:
+                pass
+
+    # ---- pretraga ----
+
+    def search(self, query: str, top_k: int = 20) -> List[Tuple[str, float]]:
+        """
+        BM25 pretraga
+
+        Returns:
+            [(chunk_id, skor), ...] sortirano opadajuće
+        """
+        started = time.perf_counter()
+        try:
+            exists = self._refresh()
+        except FileNotFoundError:
+            exists = False  # segmenti su upravo spojeni - čita se pod lock-om
+        if not exists:
+            with file_lock(self._lock_path):
+                self._ensure_locked()
+
+        terms = list(dict.fromkeys(index_terms(query, self.stem_len)))
+        with self._state_lock:
+            segments = list(self._segments)
+        if not terms or not segments:
+            return []
+
+        live = [~np.asarray(segment.deleted) for segment in segments]
+        total_docs = sum(int(np.count_nonzero(mask)) for mask in live)
+        if total_docs == 0:
+            return []
+        avg_len = sum(float(segment.lens[mask].sum()) for segment, mask in zip(segments, live)) / total_docs
+        avg_len = avg_len or 1.0
+
+        # Globalni df (uključuje obrisane dokumente do spajanja, kao Lucene)
+        df = {term: sum(segment.terms[term][1] for segment in segments if term in segment.terms)
+              for term in terms}
+
+        hits = []
+        for segment, mask in zip(segments, live):
+            scores = None
+            for term in terms:
+                entry = segment.terms.get(term)
+                if entry is None:
+                    continue
+                offset, count = entry
+                idf = math.log(1 + (total_docs - df[term] + 0.5) / (df[term] + 0.5))
+                docs = segment.docs[offset:offset + count]
+                tfs = segment.tfs[offset:offset + count]
+                norm = self.k1 * (1 - self.b + self.b * segment.lens[docs] / avg_len)
+                if scores is None:
+                    scores = np.zeros(len(segment.ids), dtype=np.float32)
+                scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+            if scores is None:
+                continue
+
+            scores[~mask] = 0
+            candidates = np.flatnonzero(scores)
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-scores[candidates], top_k)[:top_k]]
+            hits.extend((segment.ids[doc], float(scores[doc])) for doc in candidates)
+
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            self.queries += 1
+            self.total_ms += elapsed_ms
+        return hits[:top_k]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._state_lock:
+            segments = list(self._segments)
+        with self._stats_lock:
+            return {
+                'segments': len(segments),
+                'chunks': sum(len(segment.ids) for segment in segments),
+                'deleted': sum(int(np.count_nonzero(segment.deleted)) for segment in segments),
+                'queries': self.queries,
+                'avg_ms': round(self.total_ms / self.queries, 2) if self.queries else 0.0
+            }
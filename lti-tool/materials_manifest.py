@@ -0,0 +1,146 @@
+"""
+Materials Manifest
+Indeks materijala kursa (fajl -> chunk id-jevi, tip, veličina, hash, vreme upload-a)
+"""
+
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from graph_journal import file_lock
+
+
+class MaterialsManifest:
+    """
+    JSON manifest materijala jednog kursa na disku:
+
+        {"files": {"<filename>": {"filename", "type", "chunks", "chunk_ids",
+                                  "size", "hash", "uploaded_at"}}}
+
+    Održava se pri ingestion-u i brisanju, pa listing i brisanje materijala
+    ne moraju da čitaju celu ChromaDB kolekciju. Izmene idu pod flock-om
+    (više gunicorn worker-a / ingestion niti) i upisuju se atomično
+    (tmp fajl + os.replace); čitanje je bez lock-a i kešira se dok se
+    fajl ne promeni. Ako manifest ne postoji (kurs iz ranije verzije),
+    pravi se jednom iz metapodataka kolekcije preko `backfill`.
+    """
+
+    def __init__(self, path: str, backfill: Callable[[], Dict[str, Dict[str, Any]]]):
+        """
+        Args:
+            path: Putanja manifest fajla
+            backfill: Vraća {filename: unos} iz vector store-a ako manifest još ne postoji
+        """
+        self.path = path
+        self._backfill = backfill
+        self._lock_path = path + '.lock'
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        self._cache_lock = threading.Lock()
+        self._cache_key = None
+        self._cache = {}
+
+    def _stat_key(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _read(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Trenutni sadržaj sa diska (keširan po mtime/size/inode), None ako ne postoji
+        """
+        key = self._stat_key()
+        if key is None:
+            return None
+        with self._cache_lock:
+            if key == self._cache_key:
+                return self._cache
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                files = json.load(f)['files']
+        except FileNotFoundError:
+            return None
+        with self._cache_lock:
+            self._cache_key, self._cache = key, files
+        return files
+
+    def _write(self, files: Dict[str, Dict[str, Any]]):
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'files': files}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _load_locked(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Sadržaj za izmenu (poziva se pod flock-om); backfill ako manifest ne postoji
+        """
+        files = self._read()
+        if files is None:
+            files = self._backfill()
+            self._write(files)
+            print(f"✓ Materials manifest backfilled: {self.path} ({len(files)} files)")
+        return dict(files)
+
+    def files(self) -> Dict[str, Dict[str, Any]]:
+        files = self._read()
+        if files is None:
+            with file_lock(self._lock_path):
+                files = self._load_locked()
+        return files
+
+    def get(self, filename: str) -> Optional[Dict[str, Any]]:
+        return self.files().get(filename)
+
+    def upsert(self, entry: Dict[str, Any]):
+        """
+        Dodaje ili zamenjuje unos fajla (entry['filename'])
+        """
+        with file_lock(self._lock_path):
+            files = self._load_locked()
+            files[entry['filename']] = entry
+            self._write(files)
+
+    def remove(self, filename: str) -> Optional[Dict[str, Any]]:
+        """
+        Uklanja unos fajla i vraća ga (None ako ga nije bilo)
+        """
+        with file_lock(self._lock_path):
+            files = self._load_locked()
+            entry = files.pop(filename, None)
+            if entry is not None:
+                self._write(files)
+            return entry
+
+    def invalidate(self):
+        """
+        Briše manifest - sledeće čitanje ga ponovo gradi iz vector store-a
+        """
+        with file_lock(self._lock_path):
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def page(self, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Stranica liste materijala (sortirano po imenu fajla), bez chunk id-jeva
+        """
+        files = self.files()
+        names = sorted(files)
+        selected = names[offset:offset + limit] if limit is not None else names[offset:]
+        return {
+            'total_files': len(names),
+            'total_chunks': sum(entry['chunks'] for entry in files.values()),
+            'offset': offset,
+            'limit': limit,
+            'files': [
+                {key: value for key, value in files[name].items() if key != 'chunk_ids'}
+                for name in selected
+            ]
+        }
@@ -0,0 +1,148 @@
+"""
+Ollama Client
+Zajednički HTTP klijent za Ollama sa connection pool-om i ograničenjem konkurentnosti
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class OllamaBusyError(Exception):
+    """
+    Ollama je zasićen - previše pitanja čeka na slobodan slot
+    """
+
+
+class OllamaClient:
+    """
+    Thread-safe klijent za Ollama API.
+
+    Svi RAG engine-i u procesu dele jednu keep-alive sesiju. Broj istovremenih
+    generate poziva je ograničen na max_concurrency; ostali zahtevi čekaju
+    najviše queue_timeout sekundi, a ako je red čekanja pun (max_waiting)
+    odmah dobijaju OllamaBusyError (back-pressure umesto gomilanja).
+    """
+
+    def __init__(self, host: str, max_concurrency: int = 4, max_waiting: int = 32,
+                 queue_timeout: float = 30, request_timeout: float = 120):
+        """
+        Args:
+            host: Ollama URL (npr. http://ollama:11434)
+            max_concurrency: Maksimalan broj istovremenih generate poziva
+            max_waiting: Maksimalan broj zahteva koji čekaju na slot
+            queue_timeout: Koliko dugo zahtev čeka na slot (sekunde)
+            request_timeout: Timeout HTTP poziva ka Ollama (sekunde)
+        """
+        self.host = host.rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @contextmanager
+    def _slot(self):
+        with self._lock:
+            if self.waiting >= self.max_waiting:
+                self.rejected += 1
+                raise OllamaBusyError('Previše pitanja čeka na odgovor, pokušajte ponovo.')
+            self.waiting += 1
+
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+
+        with self._lock:
+            self.waiting -= 1
+            if not acquired:
+                self.rejected += 1
+            else:
+                self.in_flight += 1
+
+        if not acquired:
+            raise OllamaBusyError('Isteklo je vreme čekanja na slobodan LLM slot.')
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def generate(self, payload: Dict[str, Any]) -> requests.Response:
+        """
+        Ne-streaming /api/generate poziv
+        """
+        with self._slot():
+            return self.session.post(
+                f"{self.host}/api/generate",
+                json=payload,
+                timeout=self.request_timeout
+            )
+
+    def generate_stream(self, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming /api/generate poziv - vraća JSON delove odgovora
+
+        Slot se drži dok se stream ne potroši ili zatvori.
+        """
+        with self._slot():
+            with self.session.post(
+                f"{self.host}/api/generate",
+                json=payload,
+                stream=True,
+                timeout=self.request_timeout
+            ) as response:
+                response.raise_for_status()
+
+                for line in response.iter_lines():
+                    if line:
+                        yield json.loads(line)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'max_concurrency': self.max_concurrency,
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'completed': self.completed,
+                'rejected': self.rejected
+            }
+
+
+# Process-wide instanca
+_ollama_client = None
+_ollama_client_lock = threading.Lock()
+
+def get_ollama_client() -> OllamaClient:
+    """
+    Factory funkcija - vraća zajednički Ollama klijent za proces
+    """
+    global _ollama_client
+    if _ollama_client is None:
+        with _ollama_client_lock:
+            if _ollama_client is None:
+                _ollama_client = OllamaClient(
+                    host=os.environ.get('OLLAMA_HOST', 'http://ollama:11434'),
+                    max_concurrency=int(os.environ.get('OLLAMA_MAX_CONCURRENCY', 4)),
+                    max_waiting=int(os.environ.get('OLLAMA_MAX_WAITING', 32)),
+                    queue_timeout=float(os.environ.get('OLLAMA_QUEUE_TIMEOUT', 30)),
+                    request_timeout=float(os.environ.get('OLLAMA_REQUEST_TIMEOUT', 120))
+                )
+    return _ollama_client
@@ -0,0 +1,108 @@
+"""
+Query Cache
+Keš rezultata SPARQL upita semantičkog sloja, validiran verzijom grafa
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+class QueryResultCache:
+    """
+    LRU keš rezultata čitanja iz grafa.
+
+    Ključ je (ime upita, vezane vrednosti). Svaki unos pamti verziju grafa pod
+    kojom je izračunat i važi samo dok se ta verzija ne promeni:
+
+        - upiti vezani za kurs prate verziju tog kursa (+ epohu),
+        - globalni upiti (npr. statistika ontologije) prate globalnu verziju.
+
+    Upis u kurs (bump(course_id)) tako poništava samo unose tog kursa;
+    upis bez poznatog kursa (bump(None)) poništava sve.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        """
+        Args:
+            max_entries: Maksimalan broj keširanih rezultata (LRU)
+        """
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()  # key -> (version, result)
+        self._lock = threading.Lock()
+
+        self.global_version = 0
+        self._epoch = 0
+        self._course_versions = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def bump(self, course_id: Optional[str] = None):
+        """
+        Beleži izmenu grafa (za kurs course_id ili nepoznat kurs)
+        """
+        with self._lock:
+            self.global_version += 1
+            if course_id is None:
+                self._epoch += 1
+            else:
+                self._course_versions[course_id] = self._course_versions.get(course_id, 0) + 1
+
+    def _version(self, course_id):
+        if course_id is None:
+            return self.global_version
+        return self._epoch, self._course_versions.get(course_id, 0)
+
+    def get_or_compute(self, name: str, bindings: Dict[str, Any], compute: Callable[[], Any],
+                       course_id: Optional[str] = None):
+        """
+        Vraća keširan rezultat ili ga računa pozivom compute()
+
+        Args:
+            name: Ime upita
+            bindings: Vrednosti od kojih rezultat zavisi (deo ključa)
+            compute: Funkcija koja izvršava upit
+            course_id: Kurs za koji je upit vezan (None = globalni upit)
+        """
+        key = (name, tuple(sorted(bindings.items())))
+
+        with self._lock:
+            version = self._version(course_id)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            self.misses += 1
+
+        result = compute()
+
+        with self._lock:
+            # Ako je graf izmenjen tokom računanja, rezultat se ne čuva
+            if self._version(course_id) == version:
+                self._entries[key] = (version, result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+        return copy.deepcopy(result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'version': self.global_version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
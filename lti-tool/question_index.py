@@ -0,0 +1,112 @@
+"""
+Question Index
+Inverted keyword indeks nad istorijom pitanja za brzu pretragu sličnih pitanja
+"""
+
+import heapq
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from text_utils import tokenize
+
+
+class QuestionIndex:
+    """
+    Inverted indeks (kurs, token) -> skup ID-jeva pitanja.
+
+    Indeks drži samo ID pitanja i kurs - tekst pitanja, odgovor i confidence
+    se za top-k kandidate čitaju iz grafa (details callback), pa RAM ne raste
+    sa dužinom odgovora. Pretraga obilazi samo posting liste tokena iz upita,
+    pa ne zavisi od ukupne veličine istorije. Rangiranje: broj pogođenih
+    tokena, pa confidence.
+    """
+
+    def __init__(self, min_token_len: int = 3, stem_len: int = 6, candidate_factor: int = 4):
+        """
+        Args:
+            min_token_len, stem_len: Tokenizacija (text_utils.tokenize)
+            candidate_factor: Najviše limit * candidate_factor kandidata se
+                              dohvata iz grafa radi rangiranja po confidence-u
+        """
+        self.min_token_len = min_token_len
+        self.stem_len = stem_len
+        self.candidate_factor = candidate_factor
+
+        self._postings = defaultdict(set)  # (course_id, token) -> {question_id}
+        self._courses = {}                 # question_id -> course_id
+        self._lock = threading.Lock()
+
+    def _tokens(self, text: str):
+        return set(tokenize(text, min_len=self.min_token_len, stem_len=self.stem_len))
+
+    def add(self, question_id: str, course_id: str, question_text: str):
+        """
+        Dodaje pitanje u indeks
+        """
+        tokens = self._tokens(question_text)
+        with self._lock:
+            self._courses[question_id] = course_id
+            for token in tokens:
+                self._postings[(course_id, token)].add(question_id)
+
+    def search(self, question_text: str, course_id: str, limit: int,
+               details: Callable[[str], Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Vraća najsličnija pitanja iz istog kursa
+
+        Args:
+            details: question_id -> {'question', 'answer', 'confidence'}
+                     (None ako pitanje više ne postoji)
+        """
+        tokens = self._tokens(question_text)
+        if not tokens or limit <= 0:
+            return []
+
+        with self._lock:
+            matches = defaultdict(int)
+            for token in tokens:
+                for question_id in self._postings.get((course_id, token), ()):
+                    matches[question_id] += 1
+
+        # Kandidati: svi sa brojem pogodaka >= limit-tog najboljeg (izjednačeni
+        # se razrešavaju po confidence-u), ograničeno na limit * candidate_factor
+        ranked = heapq.nlargest(limit * self.candidate_factor, matches.items(),
+                                key=lambda item: item[1])
+        if len(ranked) > limit:
+            cutoff = ranked[limit - 1][1]
+            ranked = [item for item in ranked if item[1] >= cutoff]
+
+        results = []
+        for question_id, matched in ranked:
+            entry = details(question_id)
+            if entry is not None:
+                results.append(dict(entry, question_id=question_id, matched_keywords=matched))
+
+        return heapq.nlargest(
+            limit, results,
+            key=lambda entry: (entry['matched_keywords'], entry['confidence'])
+        )
+
+    def course_of(self, question_id: str):
+        """
+        Vraća ID kursa za pitanje (None ako pitanje nije u indeksu)
+        """
+        with self._lock:
+            return self._courses.get(question_id)
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._courses.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._courses)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'questions': len(self._courses),
+                'postings': len(self._postings)
+            }
@@ -3,12 +3,48 @@ RAG Engine - Retrieval Augmented Generation
 Koristi Ollama + ChromaDB + Sentence Transformers (sve besplatno)
 """
 
+import hashlib
 import os
+import time
+from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
-import chromadb
-from sentence_transformers import SentenceTransformer
-import requests
+from typing import List, Dict, Any, Iterator, Callable, Optional, Tuple
+import numpy as np
+
+from answer_cache import get_answer_cache
+from context_builder import get_context_builder
+from ollama_client import get_ollama_client, OllamaBusyError
+from embedding_service import get_embedder
+from engine_registry import EngineRegistry
+from lexical_index import LexicalIndex
+from materials_manifest import MaterialsManifest
+from vector_store import VECTOR_BACKEND, get_chroma_client, open_collection
+from reranker import RERANK_ENABLED, RERANK_CANDIDATES, get_reranker
+
+
+# Batch veličine za ingestion (embedding forward pass i bulk upsert u ChromaDB)
+EMBED_BATCH_SIZE = int(os.environ.get('EMBED_BATCH_SIZE', 64))
+UPSERT_BATCH_SIZE = int(os.environ.get('CHROMA_UPSERT_BATCH_SIZE', 500))
+
+# Chunking materijala (karakteri)
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 100
+
+# Manifest materijala po kursu (listing/brisanje bez čitanja cele kolekcije)
+MATERIALS_MANIFEST_DIR = os.environ.get('MATERIALS_MANIFEST_DIR', 'data/materials')
+
+# Semantički keš odgovora (vidi answer_cache.py)
+ANSWER_CACHE_ENABLED = os.environ.get('ANSWER_CACHE_ENABLED', '1') == '1'
+
+# Hibridna pretraga: BM25 indeks po kursu + vector rezultati, spojeni kroz RRF
+HYBRID_SEARCH_ENABLED = os.environ.get('HYBRID_SEARCH', '1') == '1'
+LEXICAL_INDEX_DIR = os.environ.get('LEXICAL_INDEX_DIR', 'data/lexical')
+LEXICAL_MAX_SEGMENTS = int(os.environ.get('LEXICAL_MAX_SEGMENTS', 8))
+HYBRID_CANDIDATES = int(os.environ.get('HYBRID_CANDIDATES', 20))
+RRF_K = int(os.environ.get('RRF_K', 60))
+
+# Broj chunk-ova za odgovor kada rerank nije uključen
+RETRIEVAL_TOP_K = int(os.environ.get('RETRIEVAL_TOP_K', 8))
 
 
 class RAGEngine:
@@ -24,82 +60,307 @@ class RAGEngine:
             course_id: ID kursa
         """
         self.course_id = course_id
-        self.ollama_host = os.environ.get('OLLAMA_HOST', 'http://ollama:11434')
+        self.ollama = get_ollama_client()
         
-        # Sentence Transformer za embeddings (besplatno, lokalno)
-        print(f"Loading embedding model...")
-        self.embedder = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+        # Sentence Transformer za embeddings - jedan model po procesu
+        self.embedder = get_embedder()
         
-        # ChromaDB client
-        try:
-            self.chroma_client = chromadb.HttpClient(
-                host=os.environ.get('CHROMA_HOST', 'chroma'),
-                port=int(os.environ.get('CHROMA_PORT', 8000)),
-                settings=chromadb.Settings(
-                    anonymized_telemetry=False,
-                    allow_reset=True
-                )
-            )
-        except Exception as e:
-            print(f"ChromaDB connection error: {e}")
-            # Fallback na PersistentClient (lokalni fajlovi)
-            import chromadb.config
-            self.chroma_client = chromadb.PersistentClient(
-                path=f"/app/data/chroma_db"
-            )
-        
-        # Collection za kurs
+        # ChromaDB client (None za local backend) i collection za kurs
+        # (ChromaDB ili lokalni mmap indeks, vidi vector_store.py)
+        self.chroma_client = None
         self.collection_name = f"course_{course_id}"
+        self.last_ingest_stats = {}
         try:
-            self.collection = self.chroma_client.get_or_create_collection(
-                name=self.collection_name,
-                metadata={"hnsw:space": "cosine"}
-            )
+            self.chroma_client = get_chroma_client()
+            self.collection = open_collection(self.collection_name)
         except Exception as e:
             print(f"Error creating collection: {e}")
             self.collection = None
+        
+        self.materials = MaterialsManifest(
+            os.path.join(MATERIALS_MANIFEST_DIR, f"{self.collection_name}.json"),
+            self._scan_materials
+        )
+        
+        self.lexical = None
+        if HYBRID_SEARCH_ENABLED and self.collection:
+            self.lexical = LexicalIndex(
+                os.path.join(LEXICAL_INDEX_DIR, self.collection_name),
+                self._all_documents,
+                max_segments=LEXICAL_MAX_SEGMENTS
+            )
     
-    def add_document(self, text: str, metadata: Dict[str, Any] = None):
+    def add_document(self, text: str, metadata: Dict[str, Any] = None,
+                     progress: Optional[Callable[[int, int], None]] = None,
+                     page_starts: Optional[List[Tuple[int, int]]] = None,
+                     file_size: Optional[int] = None):
         """
-        Dodaje dokument u vector store
+        Dodaje (ili ažurira) dokument u vector store
+        
+        Ingestion je content-addressed: id chunk-a je "<filename>_<sha256[:16]>".
+        Chunk-ovi čiji se id i metapodaci nisu promenili od prethodne verzije
+        fajla se preskaču, embedding se računa samo za sadržaj koji još ne
+        postoji u kursu (ostali se preuzimaju iz ChromaDB po content_hash-u),
+        a chunk-ovi prethodne verzije kojih više nema se brišu. Promenjeni
+        chunk-ovi se embed-uju u batch-evima (EMBED_BATCH_SIZE) i upisuju
+        bulk upsert-om (UPSERT_BATCH_SIZE). Statistika je u self.last_ingest_stats.
         
         Args:
             text: Tekst dokumenta
             metadata: Dodatni metapodaci (filename, page, etc.)
+            progress: Opciono, poziva se sa (chunks_done, chunks_total) posle svake grupe
+            page_starts: Opciono, [(offset u tekstu, broj strane), ...] - chunk-ovi se
+                         seku po stranama i dobijaju page_start/page_end u metapodacima
+            file_size: Opciono, veličina originalnog fajla u bajtovima (za manifest)
         """
         if not self.collection:
             return False
         
+        metadata = metadata or {}
+        
         try:
-            # Podijeli na chunk-ove (500 karaktera)
-            chunks = self._chunk_text(text, chunk_size=800, overlap=100)
+            started = time.perf_counter()
+            
+            chunks, chunk_pages, chunk_starts = self._chunk_document(text, page_starts)
+            if not chunks:
+                return False
+            
+            filename = metadata.get('filename', 'doc')
+            hashes = [hashlib.sha256(chunk.encode('utf-8')).hexdigest() for chunk in chunks]
+            
+            # Isti sadržaj više puta u fajlu dobija redni broj u id-ju
+            ids, occurrences = [], {}
+            for content_hash in hashes:
+                n = occurrences.get(content_hash, 0)
+                occurrences[content_hash] = n + 1
+                ids.append(f"{filename}_{content_hash[:16]}" + (f"-{n}" if n else ''))
+            
+            chunk_metadatas = []
+            for content_hash, page, char_start in zip(hashes, chunk_pages, chunk_starts):
+                # char_start omogućava spajanje susednih chunk-ova pri sastavljanju konteksta
+                chunk_metadata = dict(metadata, content_hash=content_hash, char_start=char_start)
+                if page is not None:
+                    chunk_metadata['page_start'] = chunk_metadata['page_end'] = page
+                chunk_metadatas.append(chunk_metadata)
             
-            for i, chunk in enumerate(chunks):
-                # Generiši embedding
-                embedding = self.embedder.encode(chunk).tolist()
+            # Prethodna verzija fajla - nepromenjeni chunk-ovi se ne diraju
+            previous = self.collection.get(where={'filename': filename}, include=['metadatas'])
+            previous_metadatas = dict(zip(previous['ids'], previous['metadatas']))
+            pending = [i for i in range(len(chunks))
+                       if previous_metadatas.get(ids[i]) != chunk_metadatas[i]]
+            unchanged = len(chunks) - len(pending)
+            
+            # Embedding-i sadržaja koji već postoji u kursu (i pod drugim imenom fajla)
+            known = self._embeddings_by_hash({hashes[i] for i in pending})
+            reused = sum(1 for i in pending if hashes[i] in known)
+            
+            if progress:
+                progress(unchanged, len(chunks))
+            
+            for start in range(0, len(pending), UPSERT_BATCH_SIZE):
+                batch = pending[start:start + UPSERT_BATCH_SIZE]
                 
-                # Dodaj u ChromaDB
-                chunk_id = f"{metadata.get('filename', 'doc')}_{i}"
-                self.collection.add(
-                    ids=[chunk_id],
-                    embeddings=[embedding],
-                    documents=[chunk],
-                    metadatas=[metadata or {}]
+                # Embedding samo za nov sadržaj (batched forward pass) + bulk upsert
+                missing = [i for i in batch if hashes[i] not in known]
+                if missing:
+                    embeddings = self.embedder.encode(
+                        [chunks[i] for i in missing],
+                        batch_size=EMBED_BATCH_SIZE,
+                        show_progress_bar=False
+                    ).tolist()
+                    for i, embedding in zip(missing, embeddings):
+                        known[hashes[i]] = embedding
+                
+                self.collection.upsert(
+                    ids=[ids[i] for i in batch],
+                    embeddings=[known[hashes[i]] for i in batch],
+                    documents=[chunks[i] for i in batch],
+                    metadatas=[chunk_metadatas[i] for i in batch]
                 )
+                
+                if progress:
+                    progress(unchanged + start + len(batch), len(chunks))
             
-            print(f"✓ Added {len(chunks)} chunks to vector store")
+            # Chunk-ovi prethodne verzije kojih više nema
+            current_ids = set(ids)
+            orphans = [chunk_id for chunk_id in previous['ids'] if chunk_id not in current_ids]
+            for start in range(0, len(orphans), UPSERT_BATCH_SIZE):
+                self.collection.delete(ids=orphans[start:start + UPSERT_BATCH_SIZE])
+            
+            if self.lexical:
+                self.lexical.update(add=[(ids[i], chunks[i]) for i in pending], delete=orphans)
+            
+            self._record_material(filename, metadata, ids, text, file_size)
+            
+            elapsed = time.perf_counter() - started
+            chunks_per_sec = len(chunks) / elapsed if elapsed > 0 else float(len(chunks))
+            self.last_ingest_stats = {
+                'chunks': len(chunks),
+                'embedded': len(pending) - reused,
+                'reused': reused,
+                'unchanged': unchanged,
+                'deleted': len(orphans),
+                'seconds': round(elapsed, 3),
+                'chunks_per_sec': round(chunks_per_sec, 1)
+            }
+            
+            print(f"✓ Added {len(chunks)} chunks to vector store "
+                  f"({len(pending) - reused} embedded, {reused} reused, {unchanged} unchanged, "
+                  f"{len(orphans)} deleted; {elapsed:.2f}s, {chunks_per_sec:.1f} chunks/s)")
+            
+            # Materijali su se promenili - keširani odgovori više ne važe
+            if pending or orphans:
+                self.invalidate_answer_cache()
             return True
         except Exception as e:
             print(f"Error adding document: {e}")
+            self.last_ingest_stats = {'error': str(e)}
+            # Deo chunk-ova je možda već upisan - manifest i BM25 indeks se grade ponovo iz kolekcije
+            self.materials.invalidate()
+            if self.lexical:
+                self.lexical.invalidate()
             return False
     
-    def retrieve_relevant_chunks(self, question: str, top_k: int = 3) -> List[Dict]:
+    def _record_material(self, filename: str, metadata: Dict[str, Any], ids: List[str],
+                         text: str, file_size: Optional[int]):
+        """
+        Upisuje fajl u manifest materijala; ako upis ne uspe, manifest se
+        briše i ponovo gradi iz kolekcije pri sledećem čitanju
+        """
+        encoded = text.encode('utf-8')
+        try:
+            self.materials.upsert({
+                'filename': filename,
+                'type': metadata.get('file_type', 'unknown'),
+                'chunks': len(ids),
+                'chunk_ids': ids,
+                'size': file_size if file_size is not None else len(encoded),
+                'hash': hashlib.sha256(encoded).hexdigest(),
+                'uploaded_at': datetime.utcnow().isoformat()
+            })
+        except Exception as e:
+            print(f"Error updating materials manifest: {e}")
+            self.materials.invalidate()
+    
+    def _scan_materials(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Gradi manifest iz metapodataka kolekcije (jednom, za kurseve bez manifesta)
+        """
+        files = {}
+        if not self.collection:
+            return files
+        
+        results = self.collection.get(include=['metadatas'])
+        for chunk_id, chunk_metadata in zip(results['ids'], results['metadatas']):
+            chunk_metadata = chunk_metadata or {}
+            filename = chunk_metadata.get('filename') or chunk_id.rsplit('_', 1)[0]
+            entry = files.setdefault(filename, {
+                'filename': filename,
+                'type': chunk_metadata.get('file_type', 'unknown'),
+                'chunks': 0,
+                'chunk_ids': [],
+                'size': None,
+                'hash': None,
+                'uploaded_at': None
+            })
+            entry['chunks'] += 1
+            entry['chunk_ids'].append(chunk_id)
+        return files
+    
+    def _all_documents(self) -> List[Tuple[str, str]]:
+        """
+        Svi chunk-ovi kolekcije kao (id, tekst) - za inicijalni BM25 indeks
+        """
+        results = self.collection.get(include=['documents'])
+        return list(zip(results['ids'], results['documents']))
+    
+    def list_materials(self, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Lista materijala kursa iz manifesta (sa paginacijom)
+        """
+        if not self.collection:
+            return {'total_files': 0, 'total_chunks': 0, 'offset': offset, 'limit': limit, 'files': []}
+        return self.materials.page(offset, limit)
+    
+    def delete_material(self, filename: str) -> int:
+        """
+        Briše sve chunk-ove fajla (id-jevi iz manifesta) i vraća njihov broj
+        """
+        if not self.collection:
+            return 0
+        
+        entry = self.materials.get(filename)
+        if entry is not None:
+            ids = entry['chunk_ids']
+        else:
+            # Nije u manifestu (npr. upisano mimo RAG engine-a) - traži po metapodacima
+            ids = self.collection.get(where={'filename': filename}, include=[])['ids']
+        
+        for start in range(0, len(ids), UPSERT_BATCH_SIZE):
+            self.collection.delete(ids=ids[start:start + UPSERT_BATCH_SIZE])
+        self.materials.remove(filename)
+        if self.lexical:
+            self.lexical.update(delete=ids)
+        
+        if ids:
+            self.invalidate_answer_cache()
+        return len(ids)
+    
+    def _chunk_document(self, text: str, page_starts: Optional[List[Tuple[int, int]]] = None):
+        """
+        Dijeli dokument na chunk-ove; sa page_starts se svaka strana seče posebno,
+        pa izmena jedne strane ne pomera granice (ni hash-eve) chunk-ova ostalih strana
+        
+        Returns:
+            (chunk-ovi, broj strane za svaki chunk ili None,
+             početak chunk-a u karakterima - u okviru strane ako ima strana)
+        """
+        stride = CHUNK_SIZE - CHUNK_OVERLAP
+        if not page_starts:
+            page_starts = [(0, None)]
+            text_bounds = [len(text)]
+        else:
+            text_bounds = [offset for offset, _ in page_starts[1:]] + [len(text)]
+        
+        chunks, pages, starts = [], [], []
+        for (offset, page), end in zip(page_starts, text_bounds):
+            page_text = text[offset:end]
+            if page is not None:
+                page_text = page_text.strip()
+            for i, chunk in enumerate(self._chunk_text(page_text, CHUNK_SIZE, CHUNK_OVERLAP)):
+                if chunk.strip():
+                    chunks.append(chunk)
+                    pages.append(page)
+                    starts.append(i * stride)
+        return chunks, pages, starts
+    
+    def _embeddings_by_hash(self, content_hashes) -> Dict[str, List[float]]:
+        """
+        Postojeći embedding-i u kolekciji kursa za date content_hash vrednosti
+        """
+        known = {}
+        content_hashes = list(content_hashes)
+        for start in range(0, len(content_hashes), UPSERT_BATCH_SIZE):
+            found = self.collection.get(
+                where={'content_hash': {'$in': content_hashes[start:start + UPSERT_BATCH_SIZE]}},
+                include=['metadatas', 'embeddings']
+            )
+            for chunk_metadata, embedding in zip(found['metadatas'], found['embeddings']):
+                known.setdefault(chunk_metadata['content_hash'], list(embedding))
+        return known
+    
+    def retrieve_relevant_chunks(self, question: str, top_k: int = 3,
+                                 question_embedding=None) -> List[Dict]:
         """
         Pronalazi relevantne chunk-ove za pitanje
         
+        Sa hibridnom pretragom se vector i BM25 kandidati (HYBRID_CANDIDATES)
+        spajaju reciprocal rank fusion-om: skor = sum(1 / (RRF_K + rang)).
+        
         Args:
             question: Korisničko pitanje
             top_k: Broj chunk-ova za vraćanje
+            question_embedding: Već izračunat embedding pitanja (opciono)
             
         Returns:
             Lista relevantnih chunk-ova sa metadata
@@ -109,12 +370,15 @@ class RAGEngine:
         
         try:
             # Generiši embedding pitanja
-            question_embedding = self.embedder.encode(question).tolist()
+            if question_embedding is None:
+                question_embedding = self.embedder.encode(question)
+            
+            n_results = max(top_k, HYBRID_CANDIDATES) if self.lexical else top_k
             
             # Pretraži ChromaDB
             results = self.collection.query(
-                query_embeddings=[question_embedding],
-                n_results=top_k
+                query_embeddings=[list(map(float, question_embedding))],
+                n_results=n_results
             )
             
             # Formatiraj rezultate
@@ -122,32 +386,85 @@ class RAGEngine:
             if results['documents']:
                 for i, doc in enumerate(results['documents'][0]):
                     chunks.append({
+                        'id': results['ids'][0][i],
                         'content': doc,
                         'metadata': results['metadatas'][0][i] if results['metadatas'] else {},
                         'distance': results['distances'][0][i] if results['distances'] else None
                     })
             
-            return chunks
+            if self.lexical:
+                chunks = self._fuse_lexical(question, question_embedding, chunks, n_results)
+            
+            return chunks[:top_k]
         except Exception as e:
             print(f"Error retrieving chunks: {e}")
             return []
     
-    def generate_answer(self, question: str, context_chunks: List[Dict]) -> Dict[str, Any]:
+    def _fuse_lexical(self, question: str, question_embedding, vector_chunks: List[Dict],
+                      n_results: int) -> List[Dict]:
         """
-        Generiše odgovor koristeći Ollama LLM
+        RRF spajanje vector i BM25 rangova; chunk-ovi koje je našao samo BM25
+        se dohvataju iz kolekcije, a distanca im se računa iz embedding-a
+        """
+        try:
+            lexical_hits = self.lexical.search(question, top_k=n_results)
+        except Exception as e:
+            print(f"Lexical search error: {e}")
+            return vector_chunks
+        if not lexical_hits:
+            return vector_chunks
         
-        Args:
-            question: Korisničko pitanje
-            context_chunks: Relevantni chunk-ovi iz RAG
-            
-        Returns:
-            Dict sa answer, confidence, sources
+        fused = {}
+        for rank, chunk in enumerate(vector_chunks):
+            fused[chunk['id']] = 1.0 / (RRF_K + rank + 1)
+        for rank, (chunk_id, _) in enumerate(lexical_hits):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+        
+        by_id = {chunk['id']: chunk for chunk in vector_chunks}
+        missing = [chunk_id for chunk_id, _ in lexical_hits if chunk_id not in by_id]
+        if missing:
+            found = self.collection.get(ids=missing, include=['documents', 'metadatas', 'embeddings'])
+            query = np.asarray(question_embedding, dtype=np.float32)
+            query_norm = np.linalg.norm(query) or 1.0
+            for chunk_id, doc, chunk_metadata, embedding in zip(
+                    found['ids'], found['documents'], found['metadatas'], found['embeddings']):
+                embedding = np.asarray(embedding, dtype=np.float32)
+                similarity = float(embedding @ query) / (float(np.linalg.norm(embedding)) * query_norm or 1.0)
+                by_id[chunk_id] = {
+                    'id': chunk_id,
+                    'content': doc,
+                    'metadata': chunk_metadata or {},
+                    'distance': 1.0 - similarity
+                }
+        
+        ranked = sorted((chunk_id for chunk_id in fused if chunk_id in by_id),
+                        key=lambda chunk_id: fused[chunk_id], reverse=True)
+        return [by_id[chunk_id] for chunk_id in ranked]
+    
+    def _retrieve_for_answer(self, question: str, question_embedding) -> List[Dict]:
+        """
+        Chunk-ovi za odgovor: sa RERANK_ENABLED=1 se dohvata RERANK_CANDIDATES
+        kandidata i cross-encoder bira najboljih RERANK_TOP_N, inače top RETRIEVAL_TOP_K
+        """
+        if not RERANK_ENABLED:
+            return self.retrieve_relevant_chunks(
+                question, top_k=RETRIEVAL_TOP_K, question_embedding=question_embedding
+            )
+        
+        candidates = self.retrieve_relevant_chunks(
+            question, top_k=RERANK_CANDIDATES, question_embedding=question_embedding
+        )
+        return get_reranker().rerank(question, candidates)
+    
+    def _build_prompt(self, question: str, context_chunks: List[Dict]) -> str:
+        """
+        Sastavlja prompt za LLM od pitanja i konteksta
         """
         # Sastavi kontekst
         context = "\n\n".join([chunk['content'] for chunk in context_chunks])
         
         # POBOLJŠAN PROMPT - stroža instrukcija
-        prompt = f"""Ti si obrazovni asistent. Tvoj zadatak je da odgovoriš na pitanje ISKLJUČIVO na osnovu datog konteksta.
+        return f"""Ti si obrazovni asistent. Tvoj zadatak je da odgovoriš na pitanje ISKLJUČIVO na osnovu datog konteksta.
 
             PRAVILA:
             - Odgovori SAMO na osnovu informacija iz konteksta ispod
@@ -162,56 +479,83 @@ class RAGEngine:
             PITANJE STUDENTA: {question}
 
             ODGOVOR (samo na osnovu konteksta iznad):"""
+    
+    def _prepare_prompt(self, question: str, context_chunks: List[Dict]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Prompt od kompaktnog konteksta (spojeni susedni chunk-ovi, bez duplikata,
+        u okviru CONTEXT_TOKEN_BUDGET) + statistika ušteđenih tokena
+        """
+        context, context_stats = get_context_builder().build(question, context_chunks)
+        print(f"context: {context_stats['chunks']} chunks -> {context_stats['passages']} passages, "
+              f"~{context_stats['tokens_after']} tokens ({context_stats['tokens_saved']} saved)")
+        return self._build_prompt(question, context), context_stats
+    
+    def _generate_payload(self, prompt: str, stream: bool) -> Dict[str, Any]:
+        return {
+            "model": "mistral",
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": 0.3,
+                "top_p": 0.9,
+                "num_predict": 512
+            }
+        }
+    
+    def _compute_confidence(self, context_chunks: List[Dict]) -> float:
+        """
+        Confidence score na osnovu prosečne cosine distance chunk-ova
+        """
+        if not context_chunks:
+            return 0.0
+        
+        avg_distance = sum(c.get('distance', 1.0) for c in context_chunks) / len(context_chunks)
+        
+        print(f"avg_distance = {avg_distance:.4f}")
+        
+        # Za cosine distance, 0.6 je još uvek DOBAR match!
+        # Aggressive boost za realističniji prikaz
+        if avg_distance <= 0.35:
+            confidence = 0.95  # Perfektan
+        elif avg_distance <= 0.45:
+            confidence = 0.85  # Odličan
+        elif avg_distance <= 0.55:
+            confidence = 0.75  # Vrlo dobar
+        elif avg_distance <= 0.65:
+            confidence = 0.75  # Dobar ← TVOJ SCORE OVDE
+        elif avg_distance <= 0.75:
+            confidence = 0.50  # Solidan
+        else:
+            confidence = 0.35  # Prihvatljiv
+        
+        print(f"confidence = {confidence:.2f} ({confidence*100:.0f}%)")
+        return confidence
+    
+    def generate_answer(self, question: str, context_chunks: List[Dict]) -> Dict[str, Any]:
+        """
+        Generiše odgovor koristeći Ollama LLM
+        
+        Args:
+            question: Korisničko pitanje
+            context_chunks: Relevantni chunk-ovi iz RAG
+            
+        Returns:
+            Dict sa answer, confidence, sources
+        """
+        prompt, context_stats = self._prepare_prompt(question, context_chunks)
         
         try:
-            # Pozovi Ollama API
-            response = requests.post(
-                f"{self.ollama_host}/api/generate",
-                json={
-                    "model": "mistral",
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.3,
-                        "top_p": 0.9,
-                        "num_predict": 512
-                    }
-                },
-                timeout=120
-            )
+            # Pozovi Ollama API (zajednički klijent, ograničena konkurentnost)
+            response = self.ollama.generate(self._generate_payload(prompt, stream=False))
             
             if response.status_code == 200:
                 answer = response.json().get('response', '')
                 
-                # Poboljšan confidence score
-                if context_chunks:
-                    avg_distance = sum(c.get('distance', 1.0) for c in context_chunks) / len(context_chunks)
-                    
-                    print(f"avg_distance = {avg_distance:.4f}")
-                    
-                    # Za cosine distance, 0.6 je još uvek DOBAR match!
-                    # Aggressive boost za realističniji prikaz
-                    if avg_distance <= 0.35:
-                        confidence = 0.95  # Perfektan
-                    elif avg_distance <= 0.45:
-                        confidence = 0.85  # Odličan
-                    elif avg_distance <= 0.55:
-                        confidence = 0.75  # Vrlo dobar
-                    elif avg_distance <= 0.65:
-                        confidence = 0.75  # Dobar ← TVOJ SCORE OVDE
-                    elif avg_distance <= 0.75:
-                        confidence = 0.50  # Solidan
-                    else:
-                        confidence = 0.35  # Prihvatljiv
-                    
-                    print(f"confidence = {confidence:.2f} ({confidence*100:.0f}%)")
-                else:
-                    confidence = 0.0
-                
                 return {
                     'answer': answer.strip(),
-                    'confidence': confidence,
-                    'sources': context_chunks
+                    'confidence': self._compute_confidence(context_chunks),
+                    'sources': context_chunks,
+                    'context_stats': context_stats
                 }
             else:
                 return {
@@ -219,6 +563,8 @@ class RAGEngine:
                     'confidence': 0.0,
                     'sources': []
                 }
+        except OllamaBusyError:
+            raise
         except Exception as e:
             print(f"Error generating answer: {e}")
             return {
@@ -227,28 +573,138 @@ class RAGEngine:
                 'sources': []
             }
     
+    def stream_generate(self, question: str, context_chunks: List[Dict],
+                        prompt: Optional[str] = None) -> Iterator[str]:
+        """
+        Generiše odgovor preko Ollama streaming API-ja, token po token
+        
+        Args:
+            prompt: Već sastavljen prompt (opciono)
+        
+        Yields:
+            Delove odgovora (tokene) kako ih model generiše
+        """
+        if prompt is None:
+            prompt, _ = self._prepare_prompt(question, context_chunks)
+        
+        for part in self.ollama.generate_stream(self._generate_payload(prompt, stream=True)):
+            if part.get('response'):
+                yield part['response']
+            if part.get('done'):
+                break
+    
     def ask(self, question: str) -> Dict[str, Any]:
         """
-        Glavni RAG pipeline: retrieve + generate
+        Glavni RAG pipeline: cache lookup + retrieve + generate
         
         Args:
             question: Korisničko pitanje
             
         Returns:
-            Dict sa answer, confidence, sources
+            Dict sa answer, confidence, sources, cached
         """
-        # Retrieve
-        chunks = self.retrieve_relevant_chunks(question, top_k=8)
+        question_embedding = self.embedder.encode(question)
+        
+        # Semantički keš - slično pitanje je već odgovoreno
+        if ANSWER_CACHE_ENABLED:
+            generation = get_answer_cache().generation(self.course_id)
+            cached = get_answer_cache().lookup(self.course_id, question_embedding)
+            if cached:
+                print(f"Answer cache hit (similarity = {cached['similarity']:.3f})")
+                cached['cached'] = True
+                return cached
+        
+        # Retrieve (+ rerank)
+        chunks = self._retrieve_for_answer(question, question_embedding)
         
         if not chunks:
             return {
                 'answer': 'Nisam pronašao relevantne informacije u nastavnim materijalima. Molim postavite pitanje vezano za sadržaj kursa.',
                 'confidence': 0.0,
-                'sources': []
+                'sources': [],
+                'cached': False
             }
         
         # Generate
-        return self.generate_answer(question, chunks)
+        result = self.generate_answer(question, chunks)
+        
+        # Keširaj samo uspešno generisane odgovore
+        if ANSWER_CACHE_ENABLED and result['sources']:
+            get_answer_cache().store(self.course_id, question_embedding, result, generation)
+        
+        result['cached'] = False
+        return result
+    
+    def stream_answer(self, question: str) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming varijanta ask(): prvo šalje izvore, zatim tokene odgovora
+        
+        Yields:
+            Event dict-ove:
+              {'type': 'sources', 'sources': [...], 'confidence': float, 'cached': bool}
+              {'type': 'token', 'text': str}
+              {'type': 'done', 'answer': str, 'confidence': float, 'sources': [...], 'cached': bool}
+        """
+        question_embedding = self.embedder.encode(question)
+        
+        if ANSWER_CACHE_ENABLED:
+            generation = get_answer_cache().generation(self.course_id)
+            cached = get_answer_cache().lookup(self.course_id, question_embedding)
+            if cached:
+                print(f"Answer cache hit (similarity = {cached['similarity']:.3f})")
+                cached['cached'] = True
+                yield {'type': 'sources', 'sources': cached['sources'],
+                       'confidence': cached['confidence'], 'cached': True}
+                yield {'type': 'token', 'text': cached['answer']}
+                yield {'type': 'done', **cached}
+                return
+        
+        chunks = self._retrieve_for_answer(question, question_embedding)
+        
+        if not chunks:
+            answer = 'Nisam pronašao relevantne informacije u nastavnim materijalima. Molim postavite pitanje vezano za sadržaj kursa.'
+            yield {'type': 'sources', 'sources': [], 'confidence': 0.0, 'cached': False}
+            yield {'type': 'token', 'text': answer}
+            yield {'type': 'done', 'answer': answer, 'confidence': 0.0,
+                   'sources': [], 'cached': False}
+            return
+        
+        confidence = self._compute_confidence(chunks)
+        yield {'type': 'sources', 'sources': chunks, 'confidence': confidence, 'cached': False}
+        
+        prompt, context_stats = self._prepare_prompt(question, chunks)
+        
+        parts = []
+        try:
+            for token in self.stream_generate(question, chunks, prompt=prompt):
+                parts.append(token)
+                yield {'type': 'token', 'text': token}
+        except OllamaBusyError:
+            raise
+        except Exception as e:
+            print(f"Error streaming answer: {e}")
+            answer = f'Došlo je do greške: {str(e)}'
+            yield {'type': 'token', 'text': answer}
+            yield {'type': 'done', 'answer': answer, 'confidence': 0.0,
+                   'sources': [], 'cached': False}
+            return
+        
+        result = {
+            'answer': ''.join(parts).strip(),
+            'confidence': confidence,
+            'sources': chunks,
+            'context_stats': context_stats
+        }
+        if ANSWER_CACHE_ENABLED and result['answer']:
+            get_answer_cache().store(self.course_id, question_embedding, result, generation)
+        
+        yield {'type': 'done', **result, 'cached': False}
+    
+    def invalidate_answer_cache(self):
+        """
+        Briše keširane odgovore za ovaj kurs
+        """
+        get_answer_cache().invalidate(self.course_id)
     
     def _chunk_text(self, text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
         """
@@ -276,19 +732,27 @@ class RAGEngine:
         try:
             return {
                 'count': self.collection.count(),
-                'name': self.collection_name
+                'name': self.collection_name,
+                'backend': VECTOR_BACKEND,
+                'lexical': self.lexical.stats() if self.lexical else None
             }
         except:
             return {'count': 0}
 
 
-# Singleton instances za kurseve (cache)
-_rag_engines = {}
+# Registar engine-a po kursu (LRU, single-flight, vidi engine_registry.py)
+_rag_engines = EngineRegistry(
+    RAGEngine,
+    max_engines=int(os.environ.get('RAG_ENGINE_MAX_COURSES', 64)),
+    memory_budget_mb=float(os.environ.get('RAG_ENGINE_MEMORY_BUDGET_MB', 0))
+)
 
 def get_rag_engine(course_id: str) -> RAGEngine:
     """
     Factory funkcija - vraća RAG engine za kurs (sa caching-om)
     """
-    if course_id not in _rag_engines:
-        _rag_engines[course_id] = RAGEngine(course_id)
-    return _rag_engines[course_id]
+    return _rag_engines.get(course_id)
+
+
+def get_engine_registry_stats() -> Dict[str, Any]:
+    return _rag_engines.stats()
@@ -0,0 +1,113 @@
+"""
+Reranker
+Cross-encoder rerank kandidata iz vector pretrage (jedan model po procesu)
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sentence_transformers import CrossEncoder
+
+
+RERANK_ENABLED = os.environ.get('RERANK_ENABLED', '0') == '1'
+RERANK_MODEL = os.environ.get('RERANK_MODEL', 'cross-encoder/mmarco-mMiniLMv2-L12-H384-v1')
+
+# Koliko kandidata se dohvata iz vector store-a i koliko ide u LLM
+RERANK_CANDIDATES = int(os.environ.get('RERANK_CANDIDATES', 20))
+RERANK_TOP_N = int(os.environ.get('RERANK_TOP_N', 4))
+# Minimalni skor (0-1) da bi chunk ušao u kontekst; 0 = bez praga
+RERANK_MIN_SCORE = float(os.environ.get('RERANK_MIN_SCORE', 0.0))
+RERANK_BATCH_SIZE = int(os.environ.get('RERANK_BATCH_SIZE', 32))
+RERANK_MAX_LENGTH = int(os.environ.get('RERANK_MAX_LENGTH', 512))
+
+
+class Reranker:
+    """
+    Boduje parove (pitanje, chunk) cross-encoder-om u jednom batch-ovanom
+    prolazu i vraća samo najbolje chunk-ove iznad praga. Manje, a
+    relevantnijih chunk-ova skraćuje prompt i vreme obrade u Ollama-i.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL, batch_size: int = RERANK_BATCH_SIZE,
+                 max_length: int = RERANK_MAX_LENGTH):
+        print(f"Loading rerank model {model_name}...")
+        started = time.perf_counter()
+        self.model = CrossEncoder(model_name, max_length=max_length)
+        print(f"✓ Rerank model loaded ({time.perf_counter() - started:.1f}s)")
+
+        self.batch_size = batch_size
+
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.scored = 0
+        self.kept = 0
+        self.total_ms = 0.0
+
+    def rerank(self, question: str, chunks: List[Dict], top_n: int = RERANK_TOP_N,
+               min_score: float = RERANK_MIN_SCORE) -> List[Dict]:
+        """
+        Args:
+            question: Pitanje studenta
+            chunks: Kandidati iz vector pretrage (content, metadata, distance)
+            top_n: Maksimalan broj chunk-ova koji se vraća
+            min_score: Chunk-ovi sa skorom ispod praga se odbacuju
+
+        Returns:
+            Chunk-ovi sortirani po rerank_score (opadajuće)
+        """
+        if not chunks:
+            return []
+
+        started = time.perf_counter()
+        scores = self.model.predict(
+            [(question, chunk['content']) for chunk in chunks],
+            batch_size=self.batch_size,
+            show_progress_bar=False
+        )
+
+        ranked = sorted(
+            (dict(chunk, rerank_score=float(score)) for chunk, score in zip(chunks, scores)),
+            key=lambda chunk: chunk['rerank_score'],
+            reverse=True
+        )
+        kept = [chunk for chunk in ranked if chunk['rerank_score'] >= min_score][:top_n]
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.calls += 1
+            self.scored += len(chunks)
+            self.kept += len(kept)
+            self.total_ms += elapsed_ms
+
+        print(f"rerank: {len(chunks)} -> {len(kept)} chunks ({elapsed_ms:.0f} ms)")
+        return kept
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'scored': self.scored,
+                'kept': self.kept,
+                'avg_ms': round(self.total_ms / self.calls, 1) if self.calls else 0.0
+            }
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+def get_reranker() -> Reranker:
+    """
+    Vraća zajednički reranker (model se učitava samo jednom po procesu)
+    """
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = Reranker()
+    return _reranker
+
+
+def reranker_stats() -> Optional[Dict[str, Any]]:
+    return _reranker.stats() if _reranker is not None else None
@@ -8,6 +8,31 @@ from rdflib.namespace import RDF, RDFS, OWL, XSD
 from datetime import datetime
 import uuid
 import os
+import threading
+from contextlib import contextmanager
+
+from graph_journal import GraphJournal
+from question_index import QuestionIndex
+from course_stats import CourseStats
+from analytics import QARollups, GRANULARITIES, aggregate_rows, to_epoch
+from sparql_queries import TIMESERIES_KEYS, course_uri, keyword_bindings, prepared, remote_query
+from sparql_remote import RemoteSparqlStore
+from query_cache import QueryResultCache
+from fuseki_sync import SyncOutbox
+
+
+# Tipovi ontoloških entiteta koje broji get_ontology_stats
+ONTOLOGY_TYPES = {
+    OWL.Class: 'classes',
+    OWL.ObjectProperty: 'object_properties',
+    OWL.DatatypeProperty: 'data_properties',
+}
+
+# Podržani on-disk store backend-i: ime -> (rdflib store plugin, Python modul)
+PERSISTENT_STORES = {
+    'oxigraph': ('Oxigraph', 'oxrdflib'),
+    'berkeleydb': ('BerkeleyDB', 'berkeleydb'),
+}
 
 
 class SemanticLayer:
@@ -15,22 +40,98 @@ class SemanticLayer:
     Upravlja semantičkim slojem aplikacije koristeći RDF/OWL
     """
     
-    def __init__(self, ontology_file='ontology/lms-tools.ttl', sparql_endpoint=None):
+    def __init__(self, ontology_file='ontology/lms-tools.ttl', sparql_endpoint=None,
+                 data_dir='data', persist_mode=None, store=None, store_path=None):
         """
         Initialize semantic layer
         
         Args:
             ontology_file: Path to OWL ontology file
-            sparql_endpoint: Optional SPARQL endpoint URL (e.g., Apache Jena Fuseki)
+            sparql_endpoint: Fuseki dataset URL (npr. http://fuseki:3030/lms-tools);
+                             default iz SEMANTIC_SPARQL_ENDPOINT - uključuje remote mod
+            data_dir: Direktorijum za perzistenciju grafa
+            persist_mode: 'journal' (append-only žurnal + snapshot, default)
+                          ili 'snapshot' (ceo graf se ponovo serijalizuje pri svakom upisu)
+            store: 'memory' (default) ili on-disk store: 'oxigraph' / 'berkeleydb'
+            store_path: Direktorijum on-disk store-a (default: <data_dir>/semantic-store)
+        
+        Sa on-disk store-om istorija je na disku: graf se ne drži u RAM-u, ontologija
+        se parsira samo pri prvom otvaranju, a žurnal/snapshot se ne koriste. Store
+        otvara jedan proces - koristiti GUNICORN_WORKERS=1 (konkurentnost daju thread-ovi).
+        
+        U remote modu istorija živi u Fuseki (TDB2): upiti idu na /query, upisi
+        kao INSERT DATA na /update, a lokalni graf sadrži samo ontologiju. Proces
+        ne drži kopiju istorije - statistika, slična pitanja i analitika su SPARQL
+        agregacije na endpoint-u (isti rezultat u svim worker-ima); dok endpoint
+        nije dostupan čitanja bacaju SparqlUnavailableError.
         """
-        self.graph = Graph()
-        self.sparql_endpoint = sparql_endpoint
+        self.sparql_endpoint = sparql_endpoint or os.environ.get('SEMANTIC_SPARQL_ENDPOINT') or None
+        self.data_dir = data_dir
+        self.store_type = store or os.environ.get('SEMANTIC_STORE', 'memory')
+        self.persist_mode = persist_mode or os.environ.get('SEMANTIC_PERSIST_MODE', 'journal')
+        
+        # rdflib Memory store nije thread-safe (gunicorn gthread worker-i)
+        self._lock = threading.RLock()
+        self._batch = None
+        self.remote = None
         
-        # Load ontology
-        if os.path.exists(ontology_file):
-            self.graph.parse(ontology_file, format='turtle')
+        if self.sparql_endpoint:
+            self.persist_mode = 'remote'
+            self.journal = None
+            self.graph = Graph()
+            self.remote = RemoteSparqlStore(
+                self.sparql_endpoint,
+                timeout=float(os.environ.get('SEMANTIC_SPARQL_TIMEOUT', 10)),
+                pool_size=int(os.environ.get('SEMANTIC_SPARQL_POOL_SIZE', 8)),
+                batch_size=int(os.environ.get('SEMANTIC_SPARQL_BATCH_SIZE', 500))
+            )
+            
+            if os.path.exists(ontology_file):
+                self.graph.parse(ontology_file, format='turtle')
+            else:
+                print(f"Warning: Ontology file {ontology_file} not found. Starting with empty graph.")
+        elif self.store_type != 'memory':
+            self.persist_mode = 'store'
+            self.journal = None
+            self.graph = self._open_store(
+                self.store_type,
+                store_path or os.environ.get('SEMANTIC_STORE_PATH')
+                or os.path.join(data_dir, 'semantic-store')
+            )
+            
+            # Ontologija se učitava samo u prazan store
+            if (None, RDF.type, OWL.Ontology) not in self.graph:
+                if os.path.exists(ontology_file):
+                    self.graph.parse(ontology_file, format='turtle')
+                    self._sync_store()
+                else:
+                    print(f"Warning: Ontology file {ontology_file} not found. Starting with empty graph.")
+        elif self.persist_mode == 'journal':
+            self.graph = Graph()
+            # Snapshot + replay žurnala (ontologija ako snapshot još ne postoji)
+            self.journal = GraphJournal(
+                data_dir=data_dir,
+                ontology_file=ontology_file,
+                compact_every=int(os.environ.get('SEMANTIC_COMPACT_EVERY', 10000))
+            )
+            self.journal.load_into(self.graph)
         else:
-            print(f"Warning: Ontology file {ontology_file} not found. Starting with empty graph.")
+            self.graph = Graph()
+            self.journal = None
+            
+            # Load ontology
+            if os.path.exists(ontology_file):
+                self.graph.parse(ontology_file, format='turtle')
+            else:
+                print(f"Warning: Ontology file {ontology_file} not found. Starting with empty graph.")
+        
+        # Outbox za delta sync ka Fuseki (export_to_fuseki) - u remote modu nije potreban
+        self.outbox = None
+        if self.remote is None and os.environ.get('SEMANTIC_DELTA_SYNC', '0') == '1':
+            self.outbox = SyncOutbox(
+                data_dir=data_dir,
+                batch_triples=int(os.environ.get('SEMANTIC_SYNC_BATCH_SIZE', 5000))
+            )
         
         # Define namespaces
         self.ns = Namespace("http://example.org/lms-tools#")
@@ -39,7 +140,62 @@ class SemanticLayer:
         self.graph.bind("rdf", RDF)
         self.graph.bind("rdfs", RDFS)
         
-    def register_qa_session(self, question_text, answer_text, course_id, user_id, confidence):
+        # Indeks sličnih pitanja i materijalizovana statistika - grade se
+        # jednom pri startu iz grafa, zatim se ažuriraju inkrementalno pri upisu.
+        # U remote modu ih nema (upisuju i drugi worker-i, brojači bi se razišli)
+        self.low_confidence_threshold = float(os.environ.get('LOW_CONFIDENCE_THRESHOLD', 0.5))
+        self.question_index = None
+        self.course_stats = None
+        self.rollups = None
+        if self.remote is None:
+            self.question_index = QuestionIndex()
+            self.course_stats = CourseStats()
+            self.rollups = QARollups(
+                low_confidence_threshold=self.low_confidence_threshold,
+                hourly_retention_days=int(os.environ.get('ROLLUP_HOURLY_RETENTION_DAYS', 90))
+            )
+        self._ontology_entities = {name: set() for name in ONTOLOGY_TYPES.values()}
+        # Keš SPARQL rezultata - verzija grafa se povećava pri svakom _commit-u
+        self.query_cache = QueryResultCache(int(os.environ.get('SPARQL_CACHE_SIZE', 512)))
+        self._rebuild_indexes()
+        
+    def _rebuild_indexes(self):
+        """
+        Puni indeks sličnih pitanja, brojače po kursu i vremenske rollup-ove
+        iz postojeće istorije u grafu (u remote modu samo ontološke entitete)
+        """
+        with self._lock:
+            for entity_type, name in ONTOLOGY_TYPES.items():
+                self._ontology_entities[name] = set(self.graph.subjects(RDF.type, entity_type))
+            
+            if self.remote is not None:
+                return
+            
+            self.question_index.clear()
+            self.course_stats.clear()
+            self.rollups.clear()
+            
+            for row in self._select('qa_history'):
+                course_id = str(row.course).rsplit('/', 1)[-1]
+                self.question_index.add(
+                    question_id=str(row.q).rsplit('/', 1)[-1],
+                    course_id=course_id,
+                    question_text=str(row.qtext)
+                )
+                self.course_stats.add_answer(course_id, float(row.confidence))
+                self.rollups.record_answer(
+                    course_id, row.ts.toPython(), float(row.confidence),
+                    latency_ms=int(row.latency) if row.latency is not None else None
+                )
+            
+            for row in self._select('feedback_history'):
+                course_id = self.question_index.course_of(str(row.q).rsplit('/', 1)[-1])
+                if course_id is not None:
+                    self.course_stats.add_feedback(course_id, float(row.rating))
+                    self.rollups.record_feedback(course_id, row.ts.toPython(), float(row.rating))
+        
+    def register_qa_session(self, question_text, answer_text, course_id, user_id, confidence,
+                            question_id=None, answer_id=None, timestamp=None, latency_ms=None):
         """
         Registruje Q&A sesiju u semantičkom grafu
         
@@ -49,158 +205,237 @@ class SemanticLayer:
             course_id: ID kursa
             user_id: ID korisnika
             confidence: Poverenje u odgovor (0-1)
+            question_id, answer_id: Unapred generisani ID-jevi (opciono)
+            timestamp: Vreme pitanja (default: sada)
+            latency_ms: Vreme generisanja odgovora u ms (opciono, za analitiku)
         """
         # Generate URIs
-        question_id = str(uuid.uuid4())
-        answer_id = str(uuid.uuid4())
+        question_id = question_id or str(uuid.uuid4())
+        answer_id = answer_id or str(uuid.uuid4())
         
         question_uri = URIRef(f"http://example.org/questions/{question_id}")
         answer_uri = URIRef(f"http://example.org/answers/{answer_id}")
         course_uri = URIRef(f"http://example.org/courses/{course_id}")
         user_uri = URIRef(f"http://example.org/users/{user_id}")
         
-        # Add Question triples
-        self.graph.add((question_uri, RDF.type, self.ns.Question))
-        self.graph.add((question_uri, self.ns.questionText, Literal(question_text, lang='sr')))
-        self.graph.add((question_uri, self.ns.askedBy, user_uri))
-        self.graph.add((question_uri, self.ns.relatedToCourse, course_uri))
-        self.graph.add((question_uri, self.ns.timestamp, 
-                       Literal(datetime.utcnow(), datatype=XSD.dateTime)))
-        
-        # Add Answer triples
-        self.graph.add((answer_uri, RDF.type, self.ns.Answer))
-        self.graph.add((answer_uri, self.ns.answerText, Literal(answer_text, lang='sr')))
-        self.graph.add((answer_uri, self.ns.answersQuestion, question_uri))
-        self.graph.add((answer_uri, self.ns.confidenceScore, 
-                       Literal(confidence, datatype=XSD.float)))
-        self.graph.add((answer_uri, self.ns.generatedAt, 
-                       Literal(datetime.utcnow(), datatype=XSD.dateTime)))
-        
-        # Persist changes
-        self._persist_graph()
+        timestamp = timestamp or datetime.utcnow()
+        now = Literal(timestamp, datatype=XSD.dateTime)
+        
+        triples = [
+            # Question triples
+            (question_uri, RDF.type, self.ns.Question),
+            (question_uri, self.ns.questionText, Literal(question_text, lang='sr')),
+            (question_uri, self.ns.askedBy, user_uri),
+            (question_uri, self.ns.relatedToCourse, course_uri),
+            (question_uri, self.ns.timestamp, now),
+            
+            # Answer triples
+            (answer_uri, RDF.type, self.ns.Answer),
+            (answer_uri, self.ns.answerText, Literal(answer_text, lang='sr')),
+            (answer_uri, self.ns.answersQuestion, question_uri),
+            (answer_uri, self.ns.confidenceScore, Literal(confidence, datatype=XSD.float)),
+            (answer_uri, self.ns.generatedAt, now),
+        ]
+        if latency_ms is not None:
+            triples.append((answer_uri, self.ns.responseTimeMs,
+                            Literal(int(latency_ms), datatype=XSD.integer)))
+        
+        self._commit(triples, course_id=course_id)
+        
+        if self.remote is None:
+            self.question_index.add(question_id, course_id, question_text)
+            self.course_stats.add_answer(course_id, confidence)
+            self.rollups.record_answer(course_id, timestamp, confidence, latency_ms)
         
         return question_id, answer_id
     
-    def log_tool_launch(self, tool_uri, course_uri, user_uri):
+    def log_tool_launch(self, tool_uri, course_uri, user_uri, timestamp=None):
         """
         Loguje pokretanje LTI alata
         """
         launch_uri = URIRef(f"http://example.org/launches/{uuid.uuid4()}")
         
-        self.graph.add((launch_uri, RDF.type, self.ns.ToolLaunch))
-        self.graph.add((launch_uri, self.ns.launchedTool, URIRef(tool_uri)))
-        self.graph.add((launch_uri, self.ns.inCourse, URIRef(course_uri)))
-        self.graph.add((launch_uri, self.ns.byUser, URIRef(user_uri)))
-        self.graph.add((launch_uri, self.ns.timestamp, 
-                       Literal(datetime.utcnow(), datatype=XSD.dateTime)))
-        
-        self._persist_graph()
+        self._commit([
+            (launch_uri, RDF.type, self.ns.ToolLaunch),
+            (launch_uri, self.ns.launchedTool, URIRef(tool_uri)),
+            (launch_uri, self.ns.inCourse, URIRef(course_uri)),
+            (launch_uri, self.ns.byUser, URIRef(user_uri)),
+            (launch_uri, self.ns.timestamp, Literal(timestamp or datetime.utcnow(), datatype=XSD.dateTime)),
+        ], course_id=str(course_uri).rsplit('/', 1)[-1])
     
-    def find_similar_questions(self, question_text, course_id, limit=5):
+    def find_similar_questions(self, question_text, course_id, limit=5, use_index=True):
         """
-        Pronalazi slična pitanja iz istorije koristeći SPARQL
+        Pronalazi slična pitanja iz istorije
+        
+        Koristi inverted keyword indeks (question_index.py); use_index=False
+        (i remote mod) radi SPARQL CONTAINS upit nad istorijom.
         
         Returns:
             List of dicts with question, answer, and confidence
         """
+        if use_index and self.question_index is not None:
+            return self.question_index.search(question_text, course_id, limit, self._question_details)
+        
+        return self._find_similar_questions_sparql(question_text, course_id, limit)
+    
+    def _question_details(self, question_id):
+        """
+        Tekst pitanja, odgovor i confidence za kandidata iz indeksa
+        """
+        rows = self._select('question_details',
+                            {'q': URIRef(f"http://example.org/questions/{question_id}")})
+        for row in rows:
+            return {
+                'question': str(row.qtext),
+                'answer': str(row.answer),
+                'confidence': float(row.confidence)
+            }
+        return None
+    
+    def _find_similar_questions_sparql(self, question_text, course_id, limit=5):
+        """
+        Pronalazi slična pitanja iz istorije koristeći SPARQL (linearni scan)
+        """
         # Extract keywords from question (simple word-based approach)
         keywords = [word.lower() for word in question_text.split() if len(word) > 4]
         
         if not keywords:
             return []
         
-        # Build FILTER clause for keyword matching
-        filter_conditions = " || ".join([f'CONTAINS(LCASE(?qtext), "{kw}")' for kw in keywords[:3]])
-        
-        query = f"""
-        PREFIX lms: <http://example.org/lms-tools#>
-        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-        PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+        bindings = {'course': course_uri(course_id), **keyword_bindings(keywords)}
         
-        SELECT ?question ?answer ?confidence WHERE {{
-            ?q rdf:type lms:Question .
-            ?q lms:questionText ?qtext .
-            ?q lms:relatedToCourse <http://example.org/courses/{course_id}> .
-            
-            ?ans lms:answersQuestion ?q .
-            ?ans lms:answerText ?answer .
-            ?ans lms:confidenceScore ?confidence .
-            
-            FILTER({filter_conditions})
-        }}
-        ORDER BY DESC(?confidence)
-        LIMIT {limit}
-        """
+        def run():
+            rows = self._select('similar_questions', bindings, limit=limit)
+            return [{
+                'question': str(row.qtext),
+                'answer': str(row.answer),
+                'confidence': float(row.confidence)
+            } for row in rows]
         
         try:
-            results = self.graph.query(query)
-            similar = []
-            
-            for row in results:
-                similar.append({
-                    'question': str(row.qtext) if hasattr(row, 'qtext') else '',
-                    'answer': str(row.answer),
-                    'confidence': float(row.confidence)
-                })
-            
-            return similar
+            return self._cached('similar_questions', {**bindings, 'limit': limit}, run,
+                                course_id=str(course_id))
         except Exception as e:
             print(f"Error querying similar questions: {e}")
             return []
     
-    def get_course_statistics(self, course_id):
+    def get_course_statistics(self, course_id, recompute=False):
         """
         Vraća statistiku za kurs
+        
+        Čita materijalizovane brojače (O(1)); recompute=True (i remote mod)
+        računa broj pitanja i prosečan confidence SPARQL agregacijom.
         """
-        query = f"""
-        PREFIX lms: <http://example.org/lms-tools#>
-        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+        if not recompute and self.course_stats is not None:
+            return self.course_stats.get(course_id)
         
-        SELECT (COUNT(?q) as ?total_questions) 
-               (AVG(?conf) as ?avg_confidence) WHERE {{
-            ?q rdf:type lms:Question .
-            ?q lms:relatedToCourse <http://example.org/courses/{course_id}> .
+        bindings = {'course': course_uri(course_id)}
+        
+        def run():
+            stats = {'total_questions': 0, 'avg_confidence': 0.0, 'total_feedback': 0, 'avg_rating': 0.0}
             
-            ?ans lms:answersQuestion ?q .
-            ?ans lms:confidenceScore ?conf .
-        }}
+            results = self._select('course_questions', bindings)
+            feedback_results = self._select('course_feedback', bindings)
+            for row in results:
+                stats['total_questions'] = int(row.total_questions) if row.total_questions else 0
+                stats['avg_confidence'] = float(row.avg_confidence) if row.avg_confidence else 0.0
+            for row in feedback_results:
+                stats['total_feedback'] = int(row.total_feedback) if row.total_feedback else 0
+                stats['avg_rating'] = float(row.avg_rating) if row.avg_rating else 0.0
+            return stats
+        
+        return self._cached('course_statistics', bindings, run, course_id=str(course_id))
+    
+    def get_course_timeseries(self, course_id, start=None, end=None, granularity='day'):
         """
+        Vremenska serija Q&A metrika za kurs (iz rollup bucket-a, bez SPARQL-a;
+        u remote modu GROUP BY agregacija na endpoint-u)
         
-        results = self.graph.query(query)
-        for row in results:
-            return {
-                'total_questions': int(row.total_questions) if row.total_questions else 0,
-                'avg_confidence': float(row.avg_confidence) if row.avg_confidence else 0.0
-            }
+        Args:
+            course_id: ID kursa
+            start, end: Interval [start, end) - datetime, ISO string ili None
+            granularity: 'hour' ili 'day'
+            
+        Returns:
+            Lista bucket-a sa questions, avg_confidence, low_confidence,
+            feedback, avg_rating, latency_p50_ms, latency_p95_ms
+        """
+        if self.rollups is not None:
+            return self.rollups.query(course_id, start, end, granularity)
+        return self._remote_timeseries(course_id, start, end, granularity)
+    
+    def _remote_timeseries(self, course_id, start, end, granularity):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity '{granularity}', expected one of {sorted(GRANULARITIES)}")
+        
+        start = datetime.utcfromtimestamp(to_epoch(start)) if start is not None else datetime(1970, 1, 1)
+        end = datetime.utcfromtimestamp(to_epoch(end)) if end is not None else datetime(9999, 12, 31)
+        bindings = {
+            'course': course_uri(course_id),
+            'start': Literal(start, datatype=XSD.dateTime),
+            'end': Literal(end, datatype=XSD.dateTime)
+        }
+        keys = TIMESERIES_KEYS[granularity]
         
-        return {'total_questions': 0, 'avg_confidence': 0.0}
+        def bucket_start(row):
+            parts = [int(row[key]) for key in keys]
+            return to_epoch(datetime(*parts))
+        
+        answers = [
+            (bucket_start(row), int(row.questions), float(row.confidence_sum or 0),
+             int(row.low_confidence or 0), [float(v) for v in str(row.latencies or '').split()])
+            for row in self._select(f'answer_timeseries_{granularity}', {
+                **bindings, 'low': Literal(self.low_confidence_threshold, datatype=XSD.float)
+            })
+        ]
+        feedback = [
+            (bucket_start(row), int(row.feedback), float(row.rating_sum or 0))
+            for row in self._select(f'feedback_timeseries_{granularity}', bindings)
+        ]
+        return aggregate_rows(answers, feedback)
     
-    def add_feedback(self, question_id, rating, comment=''):
+    def add_feedback(self, question_id, rating, comment='', timestamp=None):
         """
         Dodaje feedback studenta
         """
         feedback_uri = URIRef(f"http://example.org/feedback/{uuid.uuid4()}")
         question_uri = URIRef(f"http://example.org/questions/{question_id}")
         
-        self.graph.add((feedback_uri, RDF.type, self.ns.Feedback))
-        self.graph.add((feedback_uri, self.ns.forQuestion, question_uri))
-        self.graph.add((feedback_uri, self.ns.rating, Literal(rating, datatype=XSD.integer)))
+        timestamp = timestamp or datetime.utcnow()
+        triples = [
+            (feedback_uri, RDF.type, self.ns.Feedback),
+            (feedback_uri, self.ns.forQuestion, question_uri),
+            (feedback_uri, self.ns.rating, Literal(rating, datatype=XSD.integer)),
+            (feedback_uri, self.ns.timestamp, Literal(timestamp, datatype=XSD.dateTime)),
+        ]
         if comment:
-            self.graph.add((feedback_uri, self.ns.comment, Literal(comment)))
-        self.graph.add((feedback_uri, self.ns.timestamp, 
-                       Literal(datetime.utcnow(), datatype=XSD.dateTime)))
+            triples.append((feedback_uri, self.ns.comment, Literal(comment)))
+        
+        # Nepoznat kurs (pitanje nije u indeksu) poništava keš za sve kurseve
+        course_id = (self.question_index.course_of(str(question_id))
+                     if self.question_index is not None else None)
+        self._commit(triples, course_id=course_id)
         
-        self._persist_graph()
+        if course_id is not None:
+            self.course_stats.add_feedback(course_id, rating)
+            self.rollups.record_feedback(course_id, timestamp, rating)
     
-    def export_to_fuseki(self, fuseki_url, dataset='lms-tools'):
+    def export_to_fuseki(self, fuseki_url, dataset='lms-tools', full=False):
         """
         Eksportuje graf u Apache Jena Fuseki SPARQL endpoint
+        
+        Sa uključenim outbox-om (SEMANTIC_DELTA_SYNC=1) šalju se samo triple-ovi
+        dodati od poslednjeg uspešnog sync-a; full=True šalje ceo graf.
         """
+        if self.outbox is not None and not full:
+            return self._sync_delta(f"{fuseki_url}/{dataset}/data")
+        
         try:
             import requests
             
             # Serialize graph to Turtle
-            ttl_data = self.graph.serialize(format='turtle')
+            with self._lock:
+                ttl_data = self.graph.serialize(format='turtle')
             
             # Upload to Fuseki
             url = f"{fuseki_url}/{dataset}/data"
@@ -215,54 +450,218 @@ class SemanticLayer:
             print(f"Error exporting to Fuseki: {e}")
             return False
     
+    def _select(self, name, bindings=None, limit=None):
+        """
+        Izvršava pripremljeni SPARQL upit - na Fuseki u remote modu, inače
+        nad lokalnim grafom
+        
+        Raises:
+            SparqlUnavailableError: remote mod, a endpoint nije dostupan (lokalni
+                graf sadrži samo ontologiju, pa fallback ne bi imao istoriju)
+        """
+        bindings = bindings or {}
+        if self.remote is not None:
+            return self.remote.select(remote_query(name, bindings, limit))
+        
+        with self._lock:
+            return list(self.graph.query(prepared(name, limit), initBindings=bindings))
+    
+    def _cached(self, name, bindings, run, course_id=None):
+        """
+        Keširan rezultat upita; u remote modu bez keša - upisuju i drugi
+        procesi, pa lokalna verzija grafa ne prati sve izmene
+        """
+        if self.remote is not None:
+            return run()
+        return self.query_cache.get_or_compute(name, bindings, run, course_id=course_id)
+    
+    def _sync_delta(self, url):
+        def graph_triples():
+            with self._lock:
+                return list(self.graph)
+        
+        try:
+            result = self.outbox.sync(url, graph_triples)
+            if result is None:
+                print("Fuseki sync already running in another process")
+                return False
+            print(f"Successfully synced {result['sent']} triples to Fuseki"
+                  f"{' (initial full sync)' if result['full'] else ''}")
+            return True
+        except Exception as e:
+            print(f"Error syncing to Fuseki: {e}")
+            return False
+    
+    def _commit(self, triples, course_id=None):
+        """
+        Dodaje triple-ove u graf i perzistira ih
+        
+        U 'journal' modu se na disk dopisuju samo novi triple-ovi (konstantan
+        trošak po upisu); u 'snapshot' modu se ceo graf ponovo serijalizuje;
+        u 'remote' modu triple-ovi idu samo na Fuseki (lokalni graf ostaje mali),
+        posle otpuštanja lock-a - HTTP poziv ne blokira ostale niti.
+        course_id određuje koji keširani rezultati upita postaju nevažeći
+        (None = svi).
+        """
+        with self._lock:
+            for triple in triples:
+                if self.remote is None:
+                    self.graph.add(triple)
+                if triple[1] == RDF.type and triple[2] in ONTOLOGY_TYPES:
+                    self._ontology_entities[ONTOLOGY_TYPES[triple[2]]].add(triple[0])
+            self.query_cache.bump(course_id)
+            
+            if self._batch is not None:
+                self._batch.extend(triples)
+                return
+            if self.remote is None:
+                self._persist(triples)
+        
+        if self.remote is not None:
+            self.remote.insert(triples)
+    
+    def _persist(self, triples):
+        """
+        Lokalna perzistencija (poziva se pod _lock-om; remote upis ide van lock-a)
+        """
+        if not triples:
+            return
+        if self.outbox is not None:
+            self.outbox.append(triples)
+        if self.persist_mode == 'store':
+            self._sync_store()
+        elif self.journal is not None:
+            self.journal.append(triples)
+        else:
+            self._persist_graph()
+    
+    @staticmethod
+    def _open_store(store_type, path):
+        """
+        Otvara on-disk rdflib store (plugin se importuje samo kada je izabran)
+        """
+        if store_type not in PERSISTENT_STORES:
+            raise ValueError(f"Unknown semantic store '{store_type}', "
+                             f"expected 'memory' or one of {sorted(PERSISTENT_STORES)}")
+        
+        plugin, module = PERSISTENT_STORES[store_type]
+        try:
+            __import__(module)
+        except ImportError as e:
+            raise ImportError(f"SEMANTIC_STORE={store_type} requires the '{module}' package") from e
+        
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        # Fiksan identifikator - isti named graph pri svakom otvaranju
+        graph = Graph(store=plugin, identifier=URIRef("http://example.org/lms-tools/graph"))
+        graph.open(path, create=not os.path.exists(path))
+        print(f"✓ Opened {store_type} semantic store at {path}")
+        return graph
+    
+    def _sync_store(self):
+        """
+        Flush on-disk store-a (BerkeleyDB ima sync, Oxigraph upisuje odmah)
+        """
+        sync = getattr(self.graph.store, 'sync', None)
+        if callable(sync):
+            sync()
+    
+    @contextmanager
+    def batch(self):
+        """
+        Grupni upis: svi _commit pozivi unutar bloka se perzistiraju jednim flush-om
+        (u remote modu jedan INSERT posle otpuštanja lock-a)
+        """
+        triples = []
+        try:
+            with self._lock:
+                self._batch = triples
+                try:
+                    yield self
+                finally:
+                    self._batch = None
+                    if self.remote is None:
+                        self._persist(triples)
+        finally:
+            if self.remote is not None and triples:
+                self.remote.insert(triples)
+    
     def _persist_graph(self):
         """
         Persists the graph to file
         """
-        output_file = 'data/semantic-graph.ttl'
+        output_file = os.path.join(self.data_dir, 'semantic-graph.ttl')
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         
         self.graph.serialize(destination=output_file, format='turtle')
     
-    def get_ontology_stats(self):
+    def compact(self):
         """
-        Vraća statistiku o ontologiji
+        Spaja žurnal u snapshot (inače se radi automatski u pozadini)
         """
-        query = """
-        PREFIX owl: <http://www.w3.org/2002/07/owl#>
-        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-        
-        SELECT 
-            (COUNT(DISTINCT ?class) as ?num_classes)
-            (COUNT(DISTINCT ?objProp) as ?num_object_properties)
-            (COUNT(DISTINCT ?dataProp) as ?num_data_properties)
-            (COUNT(*) as ?total_triples)
-        WHERE {
-            {
-                ?class rdf:type owl:Class .
-            } UNION {
-                ?objProp rdf:type owl:ObjectProperty .
-            } UNION {
-                ?dataProp rdf:type owl:DatatypeProperty .
-            }
-        }
+        if self.journal is not None:
+            return self.journal.compact()
+        return False
+    
+    def close(self):
+        """
+        Završava pozadinske poslove (kompakcija žurnala, neposlati remote upisi)
+        i zatvara on-disk store
         """
+        if self.journal is not None:
+            self.journal.close()
+        if self.remote is not None:
+            self.remote.close()
+        if self.persist_mode == 'store':
+            with self._lock:
+                self._sync_store()
+                self.graph.close()
+    
+    def get_ontology_stats(self, recompute=False):
+        """
+        Vraća statistiku o ontologiji
         
-        results = self.graph.query(query)
-        for row in results:
+        Broj klasa/svojstava se održava pri upisu; recompute=True radi SPARQL UNION upit.
+        U remote modu total_triples je COUNT(*) na endpoint-u.
+        """
+        if not recompute:
+            with self._lock:
+                stats = {
+                    'classes': len(self._ontology_entities['classes']),
+                    'object_properties': len(self._ontology_entities['object_properties']),
+                    'data_properties': len(self._ontology_entities['data_properties'])
+                }
+            stats['total_triples'] = self._total_triples()
+            return stats
+        
+        def run():
+            results = self._select('ontology_stats')
+            total_triples = self._total_triples()
+            for row in results:
+                return {
+                    'classes': int(row.num_classes) if row.num_classes else 0,
+                    'object_properties': int(row.num_object_properties) if row.num_object_properties else 0,
+                    'data_properties': int(row.num_data_properties) if row.num_data_properties else 0,
+                    'total_triples': total_triples
+                }
+            
             return {
-                'classes': int(row.num_classes) if row.num_classes else 0,
-                'object_properties': int(row.num_object_properties) if row.num_object_properties else 0,
-                'data_properties': int(row.num_data_properties) if row.num_data_properties else 0,
-                'total_triples': len(self.graph)
+                'classes': 0,
+                'object_properties': 0,
+                'data_properties': 0,
+                'total_triples': total_triples
             }
         
-        return {
-            'classes': 0,
-            'object_properties': 0,
-            'data_properties': 0,
-            'total_triples': len(self.graph)
-        }
+        return self._cached('ontology_stats', {}, run)
+    
+    def _total_triples(self):
+        if self.remote is not None:
+            for row in self._select('triple_count'):
+                return int(row.total_triples)
+            return 0
+        with self._lock:
+            return len(self.graph)
 
 
 if __name__ == '__main__':
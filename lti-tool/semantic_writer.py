@@ -0,0 +1,174 @@
+"""
+Semantic Writer
+Write-behind red za upise u semantički sloj (van request path-a)
+"""
+
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict
+
+
+_STOP = object()
+
+
+class SemanticWriteQueue:
+    """
+    Ograničen in-process red sa jednim worker thread-om.
+
+    Request thread samo stavlja zapis u red (Q&A sesija, launch, feedback) i
+    odmah se vraća. Worker skuplja do batch_size zapisa, primenjuje ih kroz
+    SemanticLayer.batch() kao jednu grupnu izmenu grafa i jedan flush na disk.
+    Kada je red pun, zapis se odbacuje i broji u `dropped`.
+    """
+
+    def __init__(self, semantic_layer, maxsize: int = 1000, batch_size: int = 100,
+                 flush_interval: float = 0.5):
+        """
+        Args:
+            semantic_layer: SemanticLayer instanca
+            maxsize: Maksimalan broj zapisa u redu
+            batch_size: Maksimalan broj zapisa po grupnom upisu
+            flush_interval: Koliko dugo worker čeka da se skupi batch (sekunde)
+        """
+        self.semantic_layer = semantic_layer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._closed = False
+        self._stats_lock = threading.Lock()
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_ms = 0.0
+
+        self._worker = threading.Thread(target=self._run, name='semantic-writer', daemon=True)
+        self._worker.start()
+
+    def _submit(self, method: str, kwargs: Dict[str, Any]) -> bool:
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait((method, kwargs))
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            print(f"Warning: semantic write queue full, dropped {method}")
+            return False
+        with self._stats_lock:
+            self.enqueued += 1
+        return True
+
+    def register_qa_session(self, question_text, answer_text, course_id, user_id, confidence,
+                            latency_ms=None):
+        """
+        Stavlja Q&A sesiju u red; ID-jevi se generišu odmah da bi ih klijent dobio
+        """
+        question_id = str(uuid.uuid4())
+        answer_id = str(uuid.uuid4())
+        self._submit('register_qa_session', {
+            'question_text': question_text,
+            'answer_text': answer_text,
+            'course_id': course_id,
+            'user_id': user_id,
+            'confidence': confidence,
+            'question_id': question_id,
+            'answer_id': answer_id,
+            'timestamp': datetime.utcnow(),
+            'latency_ms': latency_ms
+        })
+        return question_id, answer_id
+
+    def log_tool_launch(self, tool_uri, course_uri, user_uri):
+        self._submit('log_tool_launch', {
+            'tool_uri': tool_uri,
+            'course_uri': course_uri,
+            'user_uri': user_uri,
+            'timestamp': datetime.utcnow()
+        })
+
+    def add_feedback(self, question_id, rating, comment=''):
+        self._submit('add_feedback', {
+            'question_id': question_id,
+            'rating': rating,
+            'comment': comment,
+            'timestamp': datetime.utcnow()
+        })
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=max(remaining, 0)) if remaining > 0 \
+                        else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._write_batch(batch)
+            if stop:
+                return
+
+    def _write_batch(self, batch):
+        started = time.perf_counter()
+        written = failed = 0
+
+        try:
+            with self.semantic_layer.batch():
+                for method, kwargs in batch:
+                    try:
+                        getattr(self.semantic_layer, method)(**kwargs)
+                        written += 1
+                    except Exception as e:
+                        failed += 1
+                        print(f"Error writing {method} to semantic layer: {e}")
+        except Exception as e:
+            print(f"Error flushing semantic layer batch: {e}")
+            failed += written
+            written = 0
+
+        with self._stats_lock:
+            self.written += written
+            self.failed += failed
+            self.batches += 1
+            self.last_batch_ms = (time.perf_counter() - started) * 1000
+
+    def close(self, timeout: float = 30):
+        """
+        Zatvara red i čeka da worker upiše sve preostale zapise
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                'depth': self._queue.qsize(),
+                'capacity': self._queue.maxsize,
+                'enqueued': self.enqueued,
+                'dropped': self.dropped,
+                'written': self.written,
+                'failed': self.failed,
+                'batches': self.batches,
+                'last_batch_ms': round(self.last_batch_ms, 2)
+            }
@@ -0,0 +1,226 @@
+"""
+SPARQL Queries
+SPARQL upiti semantičkog sloja - parsiraju se i kompajliraju jednom pri importu
+"""
+
+from functools import lru_cache
+
+from rdflib import Literal, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, XSD
+from rdflib.plugins.sparql import prepareQuery
+
+
+LMS = Namespace("http://example.org/lms-tools#")
+COURSES = "http://example.org/courses/"
+
+NAMESPACES = {'lms': LMS, 'rdf': RDF, 'owl': OWL, 'xsd': XSD}
+
+# Broj keyword promenljivih u similar_questions upitu (?kw1..?kwN)
+MAX_KEYWORDS = 3
+
+
+# Tekst upita; vrednosti (kurs, ključne reči) se nikad ne ubacuju u tekst,
+# već se vezuju kroz initBindings
+QUERIES = {
+    # Sva Q&A istorija - za indeks sličnih pitanja, brojače i rollup-ove
+    'qa_history': """
+        SELECT ?q ?qtext ?course ?ts ?confidence ?latency WHERE {
+            ?q rdf:type lms:Question .
+            ?q lms:questionText ?qtext .
+            ?q lms:relatedToCourse ?course .
+            ?q lms:timestamp ?ts .
+
+            ?ans lms:answersQuestion ?q .
+            ?ans lms:confidenceScore ?confidence .
+            OPTIONAL { ?ans lms:responseTimeMs ?latency }
+        }
+    """,
+
+    'feedback_history': """
+        SELECT ?q ?rating ?ts WHERE {
+            ?f rdf:type lms:Feedback .
+            ?f lms:forQuestion ?q .
+            ?f lms:rating ?rating .
+            ?f lms:timestamp ?ts .
+        }
+    """,
+
+    # Vezuje se: ?q - detalji top-k kandidata iz indeksa sličnih pitanja
+    'question_details': """
+        SELECT ?qtext ?answer ?confidence WHERE {
+            ?q lms:questionText ?qtext .
+
+            ?ans lms:answersQuestion ?q .
+            ?ans lms:answerText ?answer .
+            ?ans lms:confidenceScore ?confidence .
+        }
+    """,
+
+    # Vezuje se: ?course, ?kw1, ?kw2, ?kw3 (LIMIT dodaje prepared(..., limit))
+    'similar_questions': """
+        SELECT ?qtext ?answer ?confidence WHERE {
+            ?q rdf:type lms:Question .
+            ?q lms:questionText ?qtext .
+            ?q lms:relatedToCourse ?course .
+
+            ?ans lms:answersQuestion ?q .
+            ?ans lms:answerText ?answer .
+            ?ans lms:confidenceScore ?confidence .
+
+            FILTER(CONTAINS(LCASE(?qtext), ?kw1) ||
+                   CONTAINS(LCASE(?qtext), ?kw2) ||
+                   CONTAINS(LCASE(?qtext), ?kw3))
+        }
+        ORDER BY DESC(?confidence)
+    """,
+
+    # Vezuje se: ?course
+    'course_questions': """
+        SELECT (COUNT(?q) as ?total_questions)
+               (AVG(?conf) as ?avg_confidence) WHERE {
+            ?q rdf:type lms:Question .
+            ?q lms:relatedToCourse ?course .
+
+            ?ans lms:answersQuestion ?q .
+            ?ans lms:confidenceScore ?conf .
+        }
+    """,
+
+    # Vezuje se: ?course
+    'course_feedback': """
+        SELECT (COUNT(?f) as ?total_feedback)
+               (AVG(?rating) as ?avg_rating) WHERE {
+            ?q rdf:type lms:Question .
+            ?q lms:relatedToCourse ?course .
+
+            ?f lms:forQuestion ?q .
+            ?f lms:rating ?rating .
+        }
+    """,
+
+    # Ukupan broj triple-ova na endpoint-u (remote mod)
+    'triple_count': """
+        SELECT (COUNT(*) as ?total_triples) WHERE {
+            ?s ?p ?o .
+        }
+    """,
+
+    'ontology_stats': """
+        SELECT
+            (COUNT(DISTINCT ?class) as ?num_classes)
+            (COUNT(DISTINCT ?objProp) as ?num_object_properties)
+            (COUNT(DISTINCT ?dataProp) as ?num_data_properties)
+            (COUNT(*) as ?total_triples)
+        WHERE {
+            {
+                ?class rdf:type owl:Class .
+            } UNION {
+                ?objProp rdf:type owl:ObjectProperty .
+            } UNION {
+                ?dataProp rdf:type owl:DatatypeProperty .
+            }
+        }
+    """,
+}
+
+# Vremenske serije za remote mod (agregacija na endpoint-u, bucket = delovi ?ts)
+TIMESERIES_KEYS = {
+    'day': ('year', 'month', 'day'),
+    'hour': ('year', 'month', 'day', 'hour'),
+}
+_DATE_PARTS = {'year': 'YEAR', 'month': 'MONTH', 'day': 'DAY', 'hour': 'HOURS'}
+
+# Vezuje se: ?course, ?start, ?end, ?low (prag niskog confidence-a)
+_ANSWER_TIMESERIES = """
+        SELECT {keys}
+               (COUNT(?ans) as ?questions)
+               (SUM(?confidence) as ?confidence_sum)
+               (SUM(IF(?confidence < ?low, 1, 0)) as ?low_confidence)
+               (GROUP_CONCAT(?latency; separator=" ") as ?latencies) WHERE {{
+            ?q rdf:type lms:Question .
+            ?q lms:relatedToCourse ?course .
+            ?q lms:timestamp ?ts .
+
+            ?ans lms:answersQuestion ?q .
+            ?ans lms:confidenceScore ?confidence .
+            OPTIONAL {{ ?ans lms:responseTimeMs ?latency }}
+
+            FILTER(?ts >= ?start && ?ts < ?end)
+        }}
+        GROUP BY {group}
+    """
+
+# Vezuje se: ?course, ?start, ?end
+_FEEDBACK_TIMESERIES = """
+        SELECT {keys}
+               (COUNT(?f) as ?feedback)
+               (SUM(?rating) as ?rating_sum) WHERE {{
+            ?q rdf:type lms:Question .
+            ?q lms:relatedToCourse ?course .
+
+            ?f lms:forQuestion ?q .
+            ?f lms:rating ?rating .
+            ?f lms:timestamp ?ts .
+
+            FILTER(?ts >= ?start && ?ts < ?end)
+        }}
+        GROUP BY {group}
+    """
+
+for _granularity, _keys in TIMESERIES_KEYS.items():
+    _format = {
+        'keys': ' '.join(f'?{key}' for key in _keys),
+        'group': ' '.join(f'({_DATE_PARTS[key]}(?ts) AS ?{key})' for key in _keys)
+    }
+    QUERIES[f'answer_timeseries_{_granularity}'] = _ANSWER_TIMESERIES.format(**_format)
+    QUERIES[f'feedback_timeseries_{_granularity}'] = _FEEDBACK_TIMESERIES.format(**_format)
+
+PREPARED = {name: prepareQuery(text, initNs=NAMESPACES) for name, text in QUERIES.items()}
+
+
+@lru_cache(maxsize=64)
+def _prepared_limit(name, limit):
+    return prepareQuery(f"{QUERIES[name]}LIMIT {limit}\n", initNs=NAMESPACES)
+
+
+def prepared(name, limit=None):
+    """
+    Pripremljeni upit; sa limit-om varijanta sa LIMIT klauzom u tekstu
+    (kompajlira se jednom po (upit, limit))
+    """
+    if limit is None:
+        return PREPARED[name]
+    return _prepared_limit(name, int(limit))
+
+
+PREFIXES = ''.join(f"PREFIX {prefix}: <{uri}>\n" for prefix, uri in NAMESPACES.items())
+
+
+def course_uri(course_id) -> URIRef:
+    return URIRef(f"{COURSES}{course_id}")
+
+
+def keyword_bindings(keywords):
+    """
+    Vezuje do MAX_KEYWORDS ključnih reči na ?kw1..?kwN; ako ih ima manje,
+    poslednja se ponavlja (isti rezultat kao kraći OR filter)
+    """
+    keywords = list(keywords)[:MAX_KEYWORDS]
+    keywords += [keywords[-1]] * (MAX_KEYWORDS - len(keywords))
+    return {f'kw{i + 1}': Literal(kw) for i, kw in enumerate(keywords)}
+
+
+def remote_query(name, bindings=None, limit=None) -> str:
+    """
+    Samostalan tekst upita za udaljeni endpoint: PREFIX deklaracije + vezane
+    vrednosti kao VALUES blok na početku WHERE dela (radi i za agregacije,
+    za razliku od VALUES klauze na kraju upita)
+    """
+    text = QUERIES[name]
+    if bindings:
+        variables = ' '.join(f'?{var}' for var in bindings)
+        values = ' '.join(term.n3() for term in bindings.values())
+        text = text.replace('WHERE {', f'WHERE {{\n            VALUES ({variables}) {{ ({values}) }}', 1)
+    if limit is not None:
+        text += f"LIMIT {int(limit)}\n"
+    return PREFIXES + text
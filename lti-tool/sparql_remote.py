@@ -0,0 +1,167 @@
+"""
+SPARQL Remote
+HTTP klijent za udaljeni SPARQL endpoint (Apache Jena Fuseki) sa connection pool-om
+"""
+
+import io
+import threading
+import time
+from typing import Any, Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
+from rdflib.query import Result
+
+
+class SparqlUnavailableError(RuntimeError):
+    """
+    Udaljeni SPARQL endpoint nije dostupan ili upit nije uspeo
+    """
+
+
+class RemoteSparqlStore:
+    """
+    Thread-safe klijent za Fuseki dataset (npr. http://fuseki:3030/lms-tools).
+
+    Čitanja idu na /query (SPARQL JSON rezultati), upisi kao INSERT DATA
+    batch-evi na /update, kroz jednu keep-alive sesiju. Upisi koji ne uspeju
+    čuvaju se u ograničenom redu i ponovo šalju pri sledećem upisu. Posle
+    greške endpoint se preskače retry_after sekundi, da svaki zahtev ne bi
+    čekao na timeout dok je Fuseki nedostupan.
+    """
+
+    def __init__(self, endpoint: str, timeout: float = 10, pool_size: int = 8,
+                 batch_size: int = 500, max_pending: int = 10000, retry_after: float = 30):
+        """
+        Args:
+            endpoint: URL dataset-a (bez /query i /update)
+            timeout: Timeout HTTP poziva (sekunde)
+            pool_size: Maksimalan broj keep-alive konekcija
+            batch_size: Maksimalan broj triple-ova po INSERT DATA zahtevu
+            max_pending: Maksimalan broj neposlatih triple-ova koji se čuvaju za ponovni pokušaj
+            retry_after: Koliko dugo se endpoint preskače posle greške (sekunde)
+        """
+        self.endpoint = endpoint.rstrip('/')
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._pending = []
+        self._unavailable_until = 0.0
+
+        self.queries = 0
+        self.query_errors = 0
+        self.inserted_triples = 0
+        self.update_errors = 0
+        self.dropped_triples = 0
+
+    def available(self) -> bool:
+        return time.monotonic() >= self._unavailable_until
+
+    def _mark_unavailable(self):
+        self._unavailable_until = time.monotonic() + self.retry_after
+
+    def select(self, query: str) -> List[Any]:
+        """
+        Izvršava SELECT upit i vraća redove (rdflib ResultRow, pristup po imenu promenljive)
+
+        Raises:
+            SparqlUnavailableError: endpoint je nedostupan (ili označen kao takav)
+        """
+        if not self.available():
+            raise SparqlUnavailableError(f"SPARQL endpoint {self.endpoint} marked unavailable")
+        try:
+            response = self.session.post(
+                f"{self.endpoint}/query",
+                data={'query': query},
+                headers={'Accept': 'application/sparql-results+json'},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            rows = list(Result.parse(io.BytesIO(response.content), format='json'))
+        except Exception as e:
+            with self._lock:
+                self.query_errors += 1
+            self._mark_unavailable()
+            raise SparqlUnavailableError(f"SPARQL query to {self.endpoint} failed: {e}") from e
+
+        with self._lock:
+            self.queries += 1
+        return rows
+
+    def insert(self, triples):
+        """
+        Šalje triple-ove kao INSERT DATA batch-eve (zajedno sa ranije neposlatim)
+
+        Returns:
+            True ako je sve poslato
+        """
+        with self._lock:
+            pending = self._pending + list(triples)
+            self._pending = []
+
+        if not pending:
+            return True
+
+        sent = 0
+        try:
+            if not self.available():
+                raise requests.ConnectionError('SPARQL endpoint marked unavailable')
+            for start in range(0, len(pending), self.batch_size):
+                self._post_update(pending[start:start + self.batch_size])
+                sent = min(start + self.batch_size, len(pending))
+        except Exception as e:
+            self._mark_unavailable()
+            unsent = pending[sent:]
+            with self._lock:
+                self.update_errors += 1
+                self.inserted_triples += sent
+                self._pending = unsent + self._pending
+                overflow = len(self._pending) - self.max_pending
+                if overflow > 0:
+                    del self._pending[:overflow]
+                    self.dropped_triples += overflow
+            print(f"Warning: SPARQL update failed, {len(unsent)} triples queued for retry: {e}")
+            return False
+
+        with self._lock:
+            self.inserted_triples += sent
+        return True
+
+    def _post_update(self, triples):
+        body = '\n'.join(f"{s.n3()} {p.n3()} {o.n3()} ." for s, p, o in triples)
+        response = self.session.post(
+            f"{self.endpoint}/update",
+            data={'update': f"INSERT DATA {{\n{body}\n}}"},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+    def close(self):
+        """
+        Poslednji pokušaj slanja neposlatih triple-ova
+        """
+        if self._pending:
+            self._unavailable_until = 0.0
+            self.insert([])
+        self.session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'endpoint': self.endpoint,
+                'available': self.available(),
+                'queries': self.queries,
+                'query_errors': self.query_errors,
+                'inserted_triples': self.inserted_triples,
+                'update_errors': self.update_errors,
+                'pending_triples': len(self._pending),
+                'dropped_triples': self.dropped_triples
+            }
@@ -0,0 +1,62 @@
+"""
+Text Utilities
+Normalizacija i tokenizacija teksta (srpski: ćirilica/latinica, dijakritici)
+"""
+
+import re
+import unicodedata
+from typing import List
+
+
+# Srpska ćirilica -> latinica
+_CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'ђ': 'dj', 'е': 'e', 'ж': 'z',
+    'з': 'z', 'и': 'i', 'ј': 'j', 'к': 'k', 'л': 'l', 'љ': 'lj', 'м': 'm', 'н': 'n',
+    'њ': 'nj', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'ћ': 'c', 'у': 'u',
+    'ф': 'f', 'х': 'h', 'ц': 'c', 'ч': 'c', 'џ': 'dz', 'ш': 's',
+}
+
+# Latinični dijakritici (đ nema NFKD dekompoziciju)
+_LATIN_FOLD = {'đ': 'dj', 'č': 'c', 'ć': 'c', 'š': 's', 'ž': 'z'}
+
+_FOLD_TABLE = str.maketrans({**_CYRILLIC_TO_LATIN, **_LATIN_FOLD})
+
+# Tokeni zadržavaju unutrašnje tačke i crtice: "lti 1.3", "oauth2", "x-api"
+_TOKEN_RE = re.compile(r'[0-9a-z]+(?:[.\-][0-9a-z]+)*')
+
+STOPWORDS = frozenset({
+    'a', 'ali', 'bi', 'bio', 'bila', 'da', 'do', 'ga', 'i', 'ih', 'ili', 'iz', 'je',
+    'jer', 'joj', 'ju', 'kada', 'kako', 'koja', 'koje', 'koji', 'kojim', 'koju', 'li',
+    'me', 'mi', 'na', 'nego', 'ne', 'ni', 'o', 'od', 'po', 'pa', 'sa', 'se', 'su', 'sta',
+    'taj', 'te', 'to', 'u', 'uz', 'za', 'zasto', 'sto', 'gde', 'sam', 'si', 'smo',
+    'ste', 'this', 'the', 'and', 'or', 'of', 'in', 'is', 'what', 'how',
+})
+
+
+def fold(text: str) -> str:
+    """
+    Lowercase + ćirilica u latinicu + uklanjanje dijakritika
+    """
+    text = text.lower().translate(_FOLD_TABLE)
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def tokenize(text: str, min_len: int = 2, stem_len: int = 0) -> List[str]:
+    """
+    Deli tekst na normalizovane tokene bez stop-reči
+
+    Args:
+        text: Ulazni tekst
+        min_len: Minimalna dužina tokena
+        stem_len: Ako > 0, reči duže od stem_len se skraćuju na stem_len
+                  karaktera (grubi stemming za srpske padeže)
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(fold(text)):
+        if len(token) < min_len or token in STOPWORDS:
+            continue
+        if stem_len and len(token) > stem_len and token.isalpha():
+            token = token[:stem_len]
+        tokens.append(token)
+    return tokens
@@ -0,0 +1,486 @@
+"""
+Vector Store
+Backend-i za vector pretragu: ChromaDB ili lokalni memory-mapped indeks
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from graph_journal import file_lock
+
+try:
+    import hnswlib
+except ImportError:  # opciono - bez njega se uvek radi tačna pretraga
+    hnswlib = None
+
+
+# chroma (podrazumevano, PersistentClient u CHROMA_PERSIST_PATH), chroma_http
+# (ChromaDB servis, CHROMA_HOST/CHROMA_PORT - podaci se moraju prethodno preneti) ili local
+VECTOR_BACKEND = os.environ.get('VECTOR_BACKEND', 'chroma')
+VECTOR_STORE_DIR = os.environ.get('VECTOR_STORE_DIR', 'data/vectors')
+# float32 (brži matmul kroz BLAS) ili float16 (upola manje memorije)
+VECTOR_DTYPE = os.environ.get('VECTOR_DTYPE', 'float32')
+# Aproksimativna pretraga (hnswlib) za kurseve sa bar ovoliko chunk-ova; 0 = isključeno
+VECTOR_ANN_MIN_ROWS = int(os.environ.get('VECTOR_ANN_MIN_ROWS', 0))
+
+CHROMA_PERSIST_PATH = os.environ.get('CHROMA_PERSIST_PATH', '/app/data/chroma_db')
+
+
+# Process-wide ChromaDB klijent
+_chroma_client = None
+_chroma_client_lock = threading.Lock()
+
+def get_chroma_client():
+    """
+    Factory funkcija - vraća zajednički ChromaDB klijent za proces
+    (None za local backend)
+
+    Postojeći podaci su u PersistentClient direktorijumu (CHROMA_PERSIST_PATH):
+    raniji HttpClient pokušaj je uvek padao na lokalni fallback, pa ChromaDB
+    servis nema kolekcije i koristi se samo uz VECTOR_BACKEND=chroma_http
+    (posle prenosa kolekcija na servis).
+    """
+    global _chroma_client
+    if VECTOR_BACKEND == 'local':
+        return None
+    if _chroma_client is None:
+        with _chroma_client_lock:
+            if _chroma_client is None:
+                # ChromaDB se učitava samo kada se koristi
+                import chromadb
+
+                if VECTOR_BACKEND == 'chroma_http':
+                    _chroma_client = _connect_chroma_http(chromadb)
+                else:
+                    _chroma_client = chromadb.PersistentClient(path=CHROMA_PERSIST_PATH)
+                    print(f"✓ ChromaDB: PersistentClient at {CHROMA_PERSIST_PATH}"
+                          + (f" (CHROMA_HOST={os.environ['CHROMA_HOST']} is not used, "
+                             f"set VECTOR_BACKEND=chroma_http for the ChromaDB service)"
+                             if os.environ.get('CHROMA_HOST') else ''))
+    return _chroma_client
+
+
+def _connect_chroma_http(chromadb):
+    try:
+        client = chromadb.HttpClient(
+            host=os.environ.get('CHROMA_HOST', 'chroma'),
+            port=int(os.environ.get('CHROMA_PORT', 8000)),
+            settings=chromadb.Settings(
+                anonymized_telemetry=False,
+                allow_reset=True
+            )
+        )
+        # HttpClient se ne povezuje u konstruktoru - proveri da li server odgovara
+        client.heartbeat()
+        print(f"✓ ChromaDB: HttpClient {os.environ.get('CHROMA_HOST', 'chroma')}")
+        return client
+    except Exception as e:
+        print(f"ChromaDB connection error: {e}")
+        # Fallback na PersistentClient (lokalni fajlovi)
+        return chromadb.PersistentClient(path=CHROMA_PERSIST_PATH)
+
+
+def open_collection(collection_name: str):
+    """
+    Kolekcija kursa za izabrani backend (VECTOR_BACKEND)
+
+    Oba backend-a imaju isti interfejs koji koristi RAGEngine:
+    get / upsert / delete / query / count (podskup ChromaDB Collection API-ja).
+    """
+    if VECTOR_BACKEND == 'local':
+        return LocalVectorStore(os.path.join(VECTOR_STORE_DIR, collection_name))
+    return get_chroma_client().get_or_create_collection(
+        name=collection_name,
+        metadata={"hnsw:space": "cosine"}
+    )
+
+
+def _matches(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    ChromaDB `where` filter nad metapodacima: jednakost, $eq, $ne, $in, $nin, $and, $or
+    """
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(_matches(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key == '$or':
+            if not any(_matches(metadata, sub) for sub in condition):
+                return False
+            continue
+
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        for op, expected in condition.items():
+            if op == '$eq' and value != expected:
+                return False
+            if op == '$ne' and value == expected:
+                return False
+            if op == '$in' and value not in expected:
+                return False
+            if op == '$nin' and value in expected:
+                return False
+    return True
+
+
+class LocalVectorStore:
+    """
+    Lokalni vector indeks jednog kursa, bez mrežnog poziva po upitu:
+
+        state.json              {generation, dim, dtype} - menja se samo pri kompakciji
+        vectors.<gen>.bin       normalizovani embedding-i, redovi float32/float16 (mmap)
+        records.<gen>.jsonl     append-only log: {"op": "add", "row", "id", "document",
+                                "metadata"} / {"op": "del", "id"}
+
+    Upsert dopisuje redove na kraj matrice i zapise u log (stari red istog
+    id-ja postaje mrtav), delete dopisuje samo zapis. Svaki proces čita log
+    inkrementalno od poslednjeg offset-a i ponovo mapira matricu kada
+    naraste, pa gunicorn worker-i dele isti page cache. Upisi idu pod
+    flock-om; kada mrtvih redova ima više nego živih, kompakcija piše novu
+    generaciju fajlova.
+
+    Pretraga je tačna (cosine = skalarni proizvod normalizovanih vektora,
+    jedan numpy matmul); sa hnswlib i VECTOR_ANN_MIN_ROWS > 0 veliki kursevi
+    koriste aproksimativni HNSW indeks koji se gradi u memoriji procesa.
+    """
+
+    def __init__(self, path: str, dtype: str = VECTOR_DTYPE, ann_min_rows: int = VECTOR_ANN_MIN_ROWS):
+        """
+        Args:
+            path: Direktorijum indeksa kursa
+            dtype: float32 ili float16 za nove indekse
+            ann_min_rows: Minimalan broj živih redova za HNSW pretragu (0 = isključeno)
+        """
+        self.path = path
+        self.default_dtype = dtype
+        self.ann_min_rows = ann_min_rows if hnswlib is not None else 0
+
+        self.state_path = os.path.join(path, 'state.json')
+        self._lock_path = os.path.join(path, 'store.lock')
+        os.makedirs(path, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._state_key = None
+        self._reset(None)
+
+        self.queries = 0
+        self.total_ms = 0.0
+
+    # ---- stanje ----
+
+    def _reset(self, state: Optional[Dict[str, Any]]):
+        self.generation = state['generation'] if state else 0
+        self.dim = state['dim'] if state else None
+        self.dtype = np.dtype(state['dtype'] if state else self.default_dtype)
+        self._records_offset = 0
+        self._ids = []          # red -> id
+        self._documents = []    # red -> tekst
+        self._metadatas = []    # red -> metapodaci
+        self._rows = {}         # id -> živi red
+        self._alive = np.zeros(0, dtype=bool)
+        self._matrix = None
+        self._ann = None
+        self._ann_rows = 0
+
+    def _vectors_path(self, generation=None) -> str:
+        return os.path.join(self.path, f'vectors.{self.generation if generation is None else generation}.bin')
+
+    def _records_path(self, generation=None) -> str:
+        return os.path.join(self.path, f'records.{self.generation if generation is None else generation}.jsonl')
+
+    def _refresh(self):
+        """
+        Usklađuje stanje procesa sa diskom: nova generacija -> puno učitavanje,
+        inače samo novi zapisi sa kraja loga
+        """
+        try:
+            st = os.stat(self.state_path)
+            key = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            key = None
+
+        if key != self._state_key:
+            state = None
+            if key is not None:
+                with open(self.state_path, encoding='utf-8') as f:
+                    state = json.load(f)
+            self._reset(state)
+            self._state_key = key
+
+        if self.dim is None:
+            return
+
+        try:
+            with open(self._records_path(), 'rb') as f:
+                f.seek(self._records_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return
+        self._records_offset += end
+
+        for line in data[:end].splitlines():
+            self._apply(json.loads(line))
+        self._remap()
+
+    def _apply(self, record: Dict[str, Any]):
+        previous = self._rows.pop(record['id'], None)
+        if previous is not None:
+            self._alive[previous] = False
+            if self._ann is not None and previous < self._ann_rows:
+                self._ann.mark_deleted(previous)
+        if record['op'] != 'add':
+            return
+
+        row = record['row']
+        while len(self._ids) <= row:
+            self._ids.append(None)
+            self._documents.append(None)
+            self._metadatas.append(None)
+        if len(self._alive) <= row:
+            self._alive = np.concatenate([self._alive, np.zeros(max(row + 1 - len(self._alive), 1024), dtype=bool)])
+        self._ids[row] = record['id']
+        self._documents[row] = record['document']
+        self._metadatas[row] = record['metadata']
+        self._alive[row] = True
+        self._rows[record['id']] = row
+
+    def _remap(self):
+        rows = len(self._ids)
+        if rows and (self._matrix is None or len(self._matrix) < rows):
+            self._matrix = np.memmap(self._vectors_path(), dtype=self.dtype, mode='r', shape=(rows, self.dim))
+
+    def _write_state(self, generation: int, dim: int, dtype: str):
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'generation': generation, 'dim': dim, 'dtype': dtype}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.state_path)
+
+    def _append(self, vectors: Optional[np.ndarray], records: List[Dict[str, Any]]):
+        """
+        Poziva se pod flock-om: prvo redovi matrice, pa zapisi loga (čitaoci
+        vide samo zapise čiji su redovi već na disku)
+        """
+        if vectors is not None and len(vectors):
+            with open(self._vectors_path(), 'ab') as f:
+                f.write(np.ascontiguousarray(vectors, dtype=self.dtype).tobytes())
+                f.flush()
+        with open(self._records_path(), 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records))
+            f.flush()
+
+    # ---- ChromaDB-kompatibilan API ----
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._rows)
+
+    def upsert(self, ids: List[str], embeddings, documents: Optional[List[str]] = None,
+               metadatas: Optional[List[Dict[str, Any]]] = None):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [{}] * len(ids)
+
+        with file_lock(self._lock_path):
+            with self._lock:
+                self._refresh()
+                if self.dim is None:
+                    self._write_state(0, vectors.shape[1], self.default_dtype)
+                    self._refresh()
+                if vectors.shape[1] != self.dim:
+                    raise ValueError(f"Embedding dimension {vectors.shape[1]} != {self.dim}")
+
+                first_row = os.path.getsize(self._vectors_path()) // (self.dim * self.dtype.itemsize) \
+                    if os.path.exists(self._vectors_path()) else 0
+                records = [
+                    {'op': 'add', 'row': first_row + i, 'id': chunk_id,
+                     'document': document, 'metadata': metadata or {}}
+                    for i, (chunk_id, document, metadata) in enumerate(zip(ids, documents, metadatas))
+                ]
+                self._append(vectors, records)
+                self._refresh()
+
+    add = upsert
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        with file_lock(self._lock_path):
+            with self._lock:
+                self._refresh()
+                if where is not None:
+                    ids = [chunk_id for chunk_id in (ids or list(self._rows))
+                           if chunk_id in self._rows and _matches(self._metadatas[self._rows[chunk_id]], where)]
+                records = [{'op': 'del', 'id': chunk_id} for chunk_id in ids or () if chunk_id in self._rows]
+                if not records:
+                    return
+                self._append(None, records)
+                self._refresh()
+                if len(self._ids) - len(self._rows) > max(len(self._rows), 1024):
+                    self._compact_locked()
+
+    def _compact_locked(self):
+        """
+        Nova generacija fajlova samo sa živim redovima
+        """
+        live_rows = sorted(self._rows.values())
+        generation = self.generation + 1
+
+        vectors = np.asarray(self._matrix[live_rows], dtype=self.dtype) if live_rows else None
+        with open(self._vectors_path(generation), 'wb') as f:
+            if vectors is not None:
+                f.write(vectors.tobytes())
+        with open(self._records_path(generation), 'w', encoding='utf-8') as f:
+            for new_row, row in enumerate(live_rows):
+                f.write(json.dumps({'op': 'add', 'row': new_row, 'id': self._ids[row],
+                                    'document': self._documents[row],
+                                    'metadata': self._metadatas[row]}, ensure_ascii=False) + '\n')
+
+        old_vectors, old_records = self._vectors_path(), self._records_path()
+        self._write_state(generation, self.dim, self.dtype.name)
+        for old_path in (old_vectors, old_records):
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+        self._refresh()
+        print(f"✓ Vector store compacted: {self.path} ({len(live_rows)} rows)")
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            include: Optional[List[str]] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        include = ['metadatas', 'documents'] if include is None else include
+        with self._lock:
+            self._refresh()
+            if ids is not None:
+                rows = [self._rows[chunk_id] for chunk_id in ids if chunk_id in self._rows]
+            else:
+                rows = sorted(self._rows.values())
+            if where:
+                rows = [row for row in rows if _matches(self._metadatas[row], where)]
+            if limit is not None:
+                rows = rows[:limit]
+            return self._format(rows, include)
+
+    def _format(self, rows: List[int], include: List[str]) -> Dict[str, Any]:
+        result = {'ids': [self._ids[row] for row in rows]}
+        if 'documents' in include:
+            result['documents'] = [self._documents[row] for row in rows]
+        if 'metadatas' in include:
+            result['metadatas'] = [self._metadatas[row] for row in rows]
+        if 'embeddings' in include:
+            result['embeddings'] = np.asarray(self._matrix[rows], dtype=np.float32).tolist() if rows else []
+        return result
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict[str, Any]] = None,
+              include: Optional[List[str]] = None) -> Dict[str, Any]:
+        include = ['metadatas', 'documents', 'distances'] if include is None else include
+        started = time.perf_counter()
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries = queries / np.where(np.linalg.norm(queries, axis=1, keepdims=True) == 0, 1.0,
+                                     np.linalg.norm(queries, axis=1, keepdims=True))
+
+        result = {'ids': [], 'distances': [], 'documents': [], 'metadatas': [], 'embeddings': []}
+        with self._lock:
+            self._refresh()
+            rows_total = len(self._ids)
+            for query in queries:
+                if not self._rows:
+                    rows, similarities = [], []
+                elif where:
+                    rows, similarities = self._search_filtered(query, n_results, where)
+                elif self.ann_min_rows and len(self._rows) >= self.ann_min_rows:
+                    rows, similarities = self._search_ann(query, n_results)
+                else:
+                    rows, similarities = self._search_exact(query, n_results, rows_total)
+
+                formatted = self._format(rows, include)
+                result['ids'].append(formatted['ids'])
+                result['distances'].append([1.0 - float(s) for s in similarities])
+                for key in ('documents', 'metadatas', 'embeddings'):
+                    result[key].append(formatted.get(key))
+
+        for key in ('documents', 'metadatas', 'embeddings', 'distances'):
+            if key not in include:
+                result[key] = None
+
+        with self._lock:
+            self.queries += 1
+            self.total_ms += (time.perf_counter() - started) * 1000
+        return result
+
+    def _dot(self, matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+        if self.dtype == np.float32:
+            return np.asarray(matrix @ query, dtype=np.float32)
+        # float16 nema BLAS - množi se u float32 blokovima
+        return np.concatenate([
+            np.asarray(matrix[start:start + 4096], dtype=np.float32) @ query
+            for start in range(0, len(matrix), 4096)
+        ])
+    
+    def _search_exact(self, query: np.ndarray, n_results: int, rows_total: int):
+        similarities = self._dot(self._matrix[:rows_total], query)
+        similarities[~self._alive[:rows_total]] = -np.inf
+        k = min(n_results, len(self._rows))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return top.tolist(), similarities[top].tolist()
+
+    def _search_filtered(self, query: np.ndarray, n_results: int, where: Dict[str, Any]):
+        rows = [row for row in self._rows.values() if _matches(self._metadatas[row], where)]
+        if not rows:
+            return [], []
+        similarities = self._dot(self._matrix[rows], query)
+        top = np.argsort(-similarities)[:n_results]
+        return [rows[i] for i in top], similarities[top].tolist()
+
+    def _search_ann(self, query: np.ndarray, n_results: int):
+        """
+        HNSW pretraga; indeks se gradi jednom i dopunjuje novim redovima
+        """
+        rows_total = len(self._ids)
+        if self._ann is None:
+            self._ann = hnswlib.Index(space='ip', dim=self.dim)
+            self._ann.init_index(max_elements=max(rows_total * 2, 1024), ef_construction=200, M=16)
+            self._ann_rows = 0
+        if self._ann_rows < rows_total:
+            if rows_total > self._ann.get_max_elements():
+                self._ann.resize_index(rows_total * 2)
+            new_rows = np.arange(self._ann_rows, rows_total)
+            self._ann.add_items(np.asarray(self._matrix[self._ann_rows:rows_total], dtype=np.float32), new_rows)
+            for row in new_rows[~self._alive[self._ann_rows:rows_total]]:
+                self._ann.mark_deleted(int(row))
+            self._ann_rows = rows_total
+
+        k = min(n_results, len(self._rows))
+        self._ann.set_ef(max(k * 4, 64))
+        labels, distances = self._ann.knn_query(query, k=k)
+        # hnswlib 'ip' distanca je 1 - skalarni proizvod
+        return labels[0].tolist(), (1.0 - distances[0]).tolist()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return {
+                'backend': 'local',
+                'rows': len(self._ids),
+                'live': len(self._rows),
+                'dim': self.dim,
+                'dtype': self.dtype.name,
+                'generation': self.generation,
+                'ann': self._ann is not None,
+                'queries': self.queries,
+                'avg_ms': round(self.total_ms / self.queries, 3) if self.queries else 0.0
+            }
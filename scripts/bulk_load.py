@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Bulk Load Script
+Streaming upload velikog RDF grafa u Apache Jena Fuseki (Graph Store Protocol)
+
+N-Triples ulaz (.nt / .nt.gz) se čita liniju po liniju i nikad se ne drži ceo
+u memoriji; ostali formati (Turtle, RDF/XML...) se parsiraju rdflib-om pa
+šalju kao N-Triples. Svaki batch je gzip-kompresovan POST na /{dataset}/data,
+više batch-eva je istovremeno u letu kroz jednu keep-alive sesiju, a
+neuspeli zahtevi se ponavljaju sa eksponencijalnim backoff-om.
+"""
+
+import argparse
+import gzip
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+# N-Triples linija: subjekat (IRI ili blank node), predikat (IRI), ostatak je objekat
+_TRIPLE_RE = re.compile(r'^(<[^>]*>|_:\S+)\s+<[^>]*>\s+(.*)$')
+
+
+def iter_ntriples_lines(path):
+    """
+    Vraća N-Triples linije iz fajla - direktno za .nt/.nt.gz, preko rdflib-a za ostale formate
+
+    Ostali formati se serijalizuju rdflib nt serializer-om (n3() bi višelinijski
+    literal upisao u više linija), pa je svaka linija tačno jedan triple.
+    """
+    name = path.name.lower()
+    if name.endswith('.nt') or name.endswith('.nt.gz'):
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield line + '\n'
+        return
+
+    from rdflib import Graph
+    from rdflib.util import guess_format
+
+    graph = Graph()
+    graph.parse(str(path), format=guess_format(str(path)) or 'turtle')
+    print(f"   ✓ Parsirano {len(graph)} triplet-a iz {path}")
+    with tempfile.TemporaryFile() as f:
+        graph.serialize(destination=f, format='nt', encoding='utf-8')
+        del graph
+        f.seek(0)
+        for line in f:
+            line = line.decode('utf-8').strip()
+            if line:
+                yield line + '\n'
+
+
+def bnode_labels(line):
+    """
+    Labele blank node-ova na poziciji subjekta i objekta (ne '_:' unutar IRI-ja ili literala)
+    """
+    match = _TRIPLE_RE.match(line)
+    if match is None:
+        return []
+    labels = []
+    if match.group(1).startswith('_:'):
+        labels.append(match.group(1))
+    if match.group(2).startswith('_:'):
+        labels.append(match.group(2).split()[0].rstrip('.'))
+    return labels
+
+
+def _bnode_batches(bnode_lines, batch_size):
+    """
+    Deli linije sa blank node-ovima na grupe povezane zajedničkim labelama
+    (union-find) i pakuje cele grupe u batch-eve do batch_size linija; grupa
+    veća od batch_size ide sama, da labele ostanu u istom zahtevu
+    """
+    parent = {}
+
+    def find(label):
+        parent.setdefault(label, label)
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    for _, labels in bnode_lines:
+        root = find(labels[0])
+        for label in labels[1:]:
+            parent[find(label)] = root
+
+    groups = defaultdict(list)
+    for line, labels in bnode_lines:
+        groups[find(labels[0])].append(line)
+
+    batch = []
+    for group in groups.values():
+        if batch and len(batch) + len(group) > batch_size:
+            yield batch
+            batch = []
+        batch.extend(group)
+    if batch:
+        yield batch
+
+
+def iter_batches(lines, batch_size):
+    """
+    Grupiše linije jednog izvornog fajla u batch-eve. Linije sa blank node-ovima
+    se čuvaju do kraja fajla (labele važe samo unutar fajla i jednog zahteva),
+    pa šalju po grupama povezanih blank node-ova u ograničenim batch-evima
+    """
+    batch, bnode_lines = [], []
+    for line in lines:
+        labels = bnode_labels(line)
+        if labels:
+            bnode_lines.append((line, labels))
+            continue
+        batch.append(line)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+    if bnode_lines:
+        yield from _bnode_batches(bnode_lines, batch_size)
+
+
+class BulkLoader:
+    """
+    Paralelni upload batch-eva u Fuseki sa retry-em
+    """
+
+    def __init__(self, fuseki_url, dataset='lms-tools', graph=None, parallel=4,
+                 retries=5, timeout=300, compress_level=6):
+        self.data_url = f"{fuseki_url.rstrip('/')}/{dataset}/data"
+        self.query_url = f"{fuseki_url.rstrip('/')}/{dataset}/query"
+        self.graph = graph
+        self.parallel = parallel
+        self.retries = retries
+        self.timeout = timeout
+        self.compress_level = compress_level
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=parallel)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self.sent_triples = 0
+        self.sent_bytes = 0
+        self.retried = 0
+
+    @property
+    def _graph_params(self):
+        return {'graph': self.graph} if self.graph else {'default': ''}
+
+    def clear(self):
+        response = self.session.delete(self.data_url, params=self._graph_params, timeout=self.timeout)
+        if response.status_code not in (200, 204, 404):
+            response.raise_for_status()
+
+    def count(self):
+        """
+        Broj triple-ova u ciljnom grafu
+        """
+        if self.graph:
+            query = f"SELECT (COUNT(*) AS ?count) WHERE {{ GRAPH <{self.graph}> {{ ?s ?p ?o }} }}"
+        else:
+            query = "SELECT (COUNT(*) AS ?count) WHERE { ?s ?p ?o }"
+        response = self.session.post(
+            self.query_url,
+            data={'query': query},
+            headers={'Accept': 'application/sparql-results+json'},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return int(response.json()['results']['bindings'][0]['count']['value'])
+
+    def _post(self, lines):
+        body = gzip.compress(''.join(lines).encode('utf-8'), compresslevel=self.compress_level)
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.post(
+                    self.data_url,
+                    params=self._graph_params,
+                    data=body,
+                    headers={
+                        'Content-Type': 'application/n-triples; charset=utf-8',
+                        'Content-Encoding': 'gzip'
+                    },
+                    timeout=self.timeout
+                )
+                if response.status_code not in RETRY_STATUS:
+                    response.raise_for_status()
+                    break
+                error = requests.HTTPError(f"{response.status_code} {response.reason}")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+
+            if attempt == self.retries:
+                raise error
+            with self._lock:
+                self.retried += 1
+            time.sleep(min(2 ** attempt, 30))
+
+        with self._lock:
+            self.sent_triples += len(lines)
+            self.sent_bytes += len(body)
+
+    def load(self, batches, progress_every=10):
+        """
+        Šalje batch-eve sa najviše `parallel` zahteva u letu (ograničena memorija)
+        """
+        in_flight = set()
+        done_batches = 0
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+            for batch in batches:
+                if len(in_flight) >= self.parallel:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        future.result()
+                        done_batches += 1
+                        if done_batches % progress_every == 0:
+                            self._progress(started)
+                in_flight.add(executor.submit(self._post, batch))
+
+            for future in in_flight:
+                future.result()
+
+        return time.perf_counter() - started
+
+    def _progress(self, started):
+        elapsed = time.perf_counter() - started
+        rate = self.sent_triples / elapsed if elapsed > 0 else 0
+        print(f"   ... {self.sent_triples} triplet-a ({rate:.0f} triplet-a/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bulk upload RDF grafa u Apache Jena Fuseki (gzip N-Triples, Graph Store Protocol)"
+    )
+    parser.add_argument(
+        'files',
+        nargs='+',
+        help='Fajl(ovi) sa grafom (.nt, .nt.gz, .ttl, .rdf, ...)'
+    )
+    parser.add_argument(
+        '--fuseki-url',
+        default='http://localhost:3030',
+        help='URL Fuseki servera (default: http://localhost:3030)'
+    )
+    parser.add_argument(
+        '--dataset',
+        default='lms-tools',
+        help='Ime dataset-a (default: lms-tools)'
+    )
+    parser.add_argument(
+        '--graph',
+        default=None,
+        help='Named graph URI (default: default graph)'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=50000,
+        help='Broj triplet-a po zahtevu (default: 50000)'
+    )
+    parser.add_argument(
+        '--parallel',
+        type=int,
+        default=4,
+        help='Broj istovremenih zahteva (default: 4)'
+    )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=5,
+        help='Broj ponovljenih pokušaja po batch-u (default: 5)'
+    )
+    parser.add_argument(
+        '--clear',
+        action='store_true',
+        help='Obriši ciljni graf pre upload-a'
+    )
+    parser.add_argument(
+        '--no-verify',
+        action='store_true',
+        help='Preskoči proveru broja triplet-a posle upload-a'
+    )
+
+    args = parser.parse_args()
+
+    paths = [Path(file) for file in args.files]
+    for path in paths:
+        if not path.exists():
+            print(f"Fajl {path} ne postoji")
+            sys.exit(1)
+
+    loader = BulkLoader(args.fuseki_url, args.dataset, graph=args.graph,
+                        parallel=args.parallel, retries=args.retries)
+
+    try:
+        if args.clear:
+            print("Brisanje postojećih podataka...")
+            loader.clear()
+
+        before = 0 if args.no_verify else loader.count()
+
+        print(f"Upload {', '.join(map(str, paths))} u {loader.data_url} "
+              f"(batch {args.batch_size}, {args.parallel} paralelno)...")
+        # Blank node grupe se šalju na kraju svakog fajla, ne tek na kraju upload-a
+        elapsed = loader.load(
+            batch
+            for path in paths
+            for batch in iter_batches(iter_ntriples_lines(path), args.batch_size)
+        )
+
+        rate = loader.sent_triples / elapsed if elapsed > 0 else 0
+        print(f"Uspešno upload-ovano {loader.sent_triples} triplet-a za {elapsed:.1f}s "
+              f"({rate:.0f} triplet-a/s, {loader.sent_bytes / 1e6:.1f} MB gzip, "
+              f"{loader.retried} ponovljenih zahteva)")
+
+        if not args.no_verify:
+            after = loader.count()
+            added = after - before
+            print(f"   Triplet-a u grafu: {before} -> {after} (+{added})")
+            if added < loader.sent_triples:
+                # Duplikati u ulazu ili triple-ovi koji su već postojali u grafu
+                print(f"   Upozorenje: dodato {loader.sent_triples - added} triplet-a manje "
+                      f"nego poslato (duplikati ili već postojeći podaci)")
+
+    except Exception as e:
+        print(f"\nGreška: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()